@@ -0,0 +1,198 @@
+"""
+In-memory audio preprocessing before Whisper transcription.
+
+Recordings from st.audio_input arrive as PCM WAV, usually stereo at 44.1/48 kHz.
+Whisper works on 16 kHz mono internally, so we downmix, resample and trim silence
+before uploading, which cuts the upload several times over without touching disk.
+Long answers can also be cut at pauses into segments that are transcribed concurrently.
+"""
+
+import io
+import wave
+
+import numpy as np
+
+try:
+    import soundfile
+except ImportError:  # optional: FLAC compression before upload
+    soundfile = None
+
+TARGET_RATE = 16000
+FRAME_MS = 30
+SILENCE_DB = -35.0  # frames this far below the loudest frame count as silence
+PAD_MS = 200        # speech padding kept around the trimmed region
+
+# Segmentation: cut in pauses at least this long, into pieces of this many seconds
+SEGMENT_SILENCE_MS = 400
+SEGMENT_MIN_S = 8.0     # shorter pieces aren't worth a request of their own
+SEGMENT_MAX_S = 30.0    # longer pieces are cut at their quietest frame
+
+
+def decode_wav(data):
+    """Decode PCM WAV bytes into (float32 samples shaped [n, channels], sample_rate)"""
+    with wave.open(io.BytesIO(data), "rb") as wav:
+        channels = wav.getnchannels()
+        width = wav.getsampwidth()
+        rate = wav.getframerate()
+        raw = wav.readframes(wav.getnframes())
+
+    if width == 1:
+        samples = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif width == 2:
+        samples = np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768.0
+    elif width == 3:
+        b = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        ints = b[:, 0] | (b[:, 1] << 8) | (b[:, 2] << 16)
+        ints = np.where(ints & 0x800000, ints - 0x1000000, ints)
+        samples = ints.astype(np.float32) / 8388608.0
+    elif width == 4:
+        samples = np.frombuffer(raw, dtype="<i4").astype(np.float32) / 2147483648.0
+    else:
+        raise ValueError(f"Unsupported sample width: {width} bytes")
+
+    return samples.reshape(-1, channels), rate
+
+
+def encode_wav(samples, rate):
+    """Encode float samples in [-1, 1] as 16-bit mono PCM WAV bytes"""
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767.0).astype("<i2")
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(pcm.tobytes())
+    return buf.getvalue()
+
+
+def to_mono(samples):
+    return samples.mean(axis=1) if samples.ndim == 2 else samples
+
+
+def resample(samples, rate, target_rate=TARGET_RATE):
+    """Linear-interpolation resampling; averages blocks first when downsampling to limit aliasing"""
+    if rate == target_rate or len(samples) == 0:
+        return samples.astype(np.float32)
+    factor = rate // target_rate
+    if factor > 1:
+        usable = len(samples) - len(samples) % factor
+        samples = samples[:usable].reshape(-1, factor).mean(axis=1)
+        rate = rate / factor
+    duration = len(samples) / rate
+    n_out = int(round(duration * target_rate))
+    src_t = np.arange(len(samples)) / rate
+    dst_t = np.arange(n_out) / target_rate
+    return np.interp(dst_t, src_t, samples).astype(np.float32)
+
+
+def frame_energy_db(samples, rate, frame_ms=FRAME_MS):
+    """RMS energy per frame in dB (relative to full scale)"""
+    frame = max(1, int(rate * frame_ms / 1000))
+    n_frames = len(samples) // frame
+    if n_frames == 0:
+        return np.zeros(0, dtype=np.float32), frame
+    frames = samples[:n_frames * frame].reshape(n_frames, frame)
+    rms = np.sqrt(np.mean(frames ** 2, axis=1))
+    return 20 * np.log10(rms + 1e-10), frame
+
+
+def speech_mask(samples, rate, silence_db=SILENCE_DB, frame_ms=FRAME_MS):
+    """Energy VAD: boolean mask of frames that contain speech, plus the frame length"""
+    energy, frame = frame_energy_db(samples, rate, frame_ms)
+    if len(energy) == 0:
+        return np.zeros(0, dtype=bool), frame
+    # Relative to the loudest frame, but never treat near-digital-silence as speech
+    threshold = max(energy.max() + silence_db, -60.0)
+    return energy > threshold, frame
+
+
+def trim_silence(samples, rate, silence_db=SILENCE_DB, pad_ms=PAD_MS):
+    """Drop leading and trailing silence, keeping pad_ms of context around the speech"""
+    mask, frame = speech_mask(samples, rate, silence_db)
+    voiced = np.flatnonzero(mask)
+    if len(voiced) == 0:
+        return samples[:0]
+    pad = int(rate * pad_ms / 1000)
+    start = max(0, voiced[0] * frame - pad)
+    end = min(len(samples), (voiced[-1] + 1) * frame + pad)
+    return samples[start:end]
+
+
+def split_at_silence(samples, rate, silence_ms=SEGMENT_SILENCE_MS, min_s=SEGMENT_MIN_S,
+                     max_s=SEGMENT_MAX_S, silence_db=SILENCE_DB):
+    """
+    Cut a recording into consecutive [(start, end)] sample ranges, in the middle of pauses
+    of at least silence_ms, so that pieces are at least min_s and at most max_s long
+    (the last one may be shorter). Short recordings come back as one range.
+    """
+    mask, frame = speech_mask(samples, rate, silence_db)
+    n_frames = len(mask)
+    min_frames = max(1, int(min_s * rate / frame))
+    max_frames = max(min_frames + 1, int(max_s * rate / frame))
+    if n_frames < 2 * min_frames:
+        return [(0, len(samples))]
+
+    # Candidate cuts: the middle of every long enough silent run
+    silent_run = max(1, int(silence_ms / (1000 * frame / rate)))
+    padded = np.concatenate(([True], mask, [True])).astype(np.int8)
+    edges = np.flatnonzero(np.diff(padded))  # alternating speech start / end frames
+    starts, ends = edges[0::2], edges[1::2]
+    gaps = [(e, s) for e, s in zip(ends[:-1], starts[1:]) if s - e >= silent_run]
+    candidates = [(e + s) // 2 for e, s in gaps]
+
+    energy, _ = frame_energy_db(samples, rate)
+    cuts, start = [], 0
+    for cut in candidates + [n_frames]:
+        # Speech without a usable pause: cut at the quietest frame the length limits allow
+        while cut - start > max_frames:
+            window = energy[start + min_frames:start + max_frames]
+            start = start + min_frames + int(np.argmin(window))
+            cuts.append(start)
+        if cut - start >= min_frames and n_frames - cut >= min_frames:
+            cuts.append(cut)
+            start = cut
+
+    bounds = [0] + [c * frame for c in cuts] + [len(samples)]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def _encode(samples, compress):
+    """(filename, upload bytes) for a piece of 16 kHz mono audio"""
+    if compress and soundfile is not None:
+        buf = io.BytesIO()
+        soundfile.write(buf, samples, TARGET_RATE, format="FLAC", subtype="PCM_16")
+        return "speech.flac", buf.getvalue()
+    return "speech.wav", encode_wav(samples, TARGET_RATE)
+
+
+def preprocess_audio(data, compress=False, segment=False):
+    """
+    Normalize a recording for transcription, entirely in memory.
+    Returns a dict with the upload bytes and filename, sizes before/after and durations.
+    With segment=True it also has "segments": [(filename, bytes)] cut at pauses (see
+    split_at_silence), in order. Input that is not PCM WAV is passed through unchanged.
+    """
+    result = {
+        "data": data,
+        "filename": "speech.wav",
+        "bytes_in": len(data),
+        "bytes_out": len(data),
+        "seconds_in": None,
+        "seconds_out": None,
+    }
+    if segment:
+        result["segments"] = [("speech.wav", data)]
+    try:
+        samples, rate = decode_wav(data)
+    except (wave.Error, EOFError, ValueError):
+        return result
+
+    result["seconds_in"] = len(samples) / rate if rate else 0.0
+    speech = trim_silence(resample(to_mono(samples), rate), TARGET_RATE)
+    result["seconds_out"] = len(speech) / TARGET_RATE
+
+    result["filename"], result["data"] = _encode(speech, compress)
+    result["bytes_out"] = len(result["data"])
+    if segment:
+        result["segments"] = [_encode(speech[start:end], compress) for start, end in split_at_silence(speech, TARGET_RATE)]
+    return result
@@ -0,0 +1,95 @@
+"""
+Bounded conversation context for the interviewer model.
+
+The system prompt and the last few turns are always sent verbatim. Older turns are folded
+into a running summary once the prompt would exceed the token budget. The summary is
+updated incrementally (previous summary + newly folded turns) and reused on every later
+turn, so prompt size stays roughly flat no matter how long the interview runs.
+"""
+
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD_TOKENS = 4
+
+SUMMARY_PROMPT = """
+You maintain running notes of a mock interview for the interviewer.
+Update the existing notes with the new exchanges. Keep: the candidate's name, background,
+questions already asked, key points of each answer, coding results, and any signals about
+strengths or weaknesses. Use short bullet points and stay under 150 words.
+"""
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for English text (~4 characters per token)"""
+    if not text:
+        return 0
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def estimate_message_tokens(messages) -> int:
+    """Estimated prompt size of a chat message list, including per-message overhead"""
+    return sum(estimate_tokens(m["content"]) + MESSAGE_OVERHEAD_TOKENS for m in messages)
+
+
+def summary_messages(summary, turns):
+    """Prompt that folds turns into the existing summary (the summarize step of ConversationContext)"""
+    transcript = "\n".join(f"{m['role']}: {m['content']}" for m in turns)
+    return [
+        {"role": "system", "content": SUMMARY_PROMPT},
+        {"role": "user", "content": f"Existing notes:\n{summary or '(none)'}\n\nNew exchanges:\n{transcript}"},
+    ]
+
+
+class ConversationContext:
+    """
+    Keeps the prompt for each turn under a token budget.
+    - token_budget: target size of the whole prompt (system messages included)
+    - keep_turns: number of recent user/assistant turns always sent verbatim
+    - summarize: callable(previous_summary, messages) -> new summary text
+    """
+
+    def __init__(self, summarize, token_budget=3000, keep_turns=4):
+        self.summarize = summarize
+        self.token_budget = token_budget
+        self.keep_messages = keep_turns * 2
+        self.summary = ""
+        self.summarized_upto = 0
+
+    def reset(self):
+        self.summary = ""
+        self.summarized_upto = 0
+
+    def drop_prefix(self, count):
+        """The caller removed the first count messages of its history (already summarized ones)"""
+        self.summarized_upto = max(self.summarized_upto - count, 0)
+
+    def summary_message(self):
+        if not self.summary:
+            return []
+        return [{
+            "role": "system",
+            "content": f"Summary of the earlier part of this interview:\n{self.summary}",
+        }]
+
+    def build(self, system_msgs, history):
+        """Return system messages + summary of older turns + recent turns verbatim"""
+        # History was cleared or replaced (e.g. interview reset) - start over
+        if len(history) < self.summarized_upto:
+            self.reset()
+
+        recent = history[self.summarized_upto:]
+        messages = system_msgs + self.summary_message() + recent
+
+        # Fold in batches of keep_turns turns so the summary is updated once every few
+        # turns instead of being regenerated on every call
+        if estimate_message_tokens(messages) > self.token_budget and len(recent) >= 2 * self.keep_messages:
+            fold_upto = len(history) - self.keep_messages
+            to_fold = history[self.summarized_upto:fold_upto]
+            try:
+                self.summary = self.summarize(self.summary, to_fold)
+                self.summarized_upto = fold_upto
+            except Exception:
+                # Keep the previous summary and send the turns verbatim; retry next turn
+                return messages
+            messages = system_msgs + self.summary_message() + history[self.summarized_upto:]
+
+        return messages
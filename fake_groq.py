@@ -0,0 +1,197 @@
+"""
+Local stand-in for the Groq API, for load tests and offline development.
+
+Serves the OpenAI-compatible endpoints the app uses (chat completions, streamed or not, and
+audio transcriptions) with configurable latency and error distributions, so the app's
+behaviour under load can be measured without spending API quota:
+
+    python fake_groq.py --port 8400 --latency-ms 400 --error-rate 0.02
+    GROQ_BASE_URL=http://127.0.0.1:8400 GROQ_API_KEY=fake streamlit run app.py
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_REPLY = (
+    "Thanks, that's helpful context. I'd like to hear a bit more about how you approached it, "
+    "what trade-offs you considered and what you would do differently next time. "
+    "Now let's move to the coding round. Which programming language would you prefer to use: Python, Java, or C++?"
+)
+
+
+class FakeGroqConfig:
+    """
+    Latency and failure model of the fake API.
+    - latency_ms / latency_sigma: lognormal total latency of a non-streamed completion (median, shape)
+    - ttft_ms: lognormal time to the first streamed token (same shape)
+    - tokens_per_s: streaming speed after the first token
+    - error_rate: probability that a request fails; rate_limit_share of failures are 429s, the rest 503s
+    - transcription_ms: latency of a transcription, plus transcription_ms_per_s per second of
+      uploaded audio (estimated from the upload size as 16 kHz 16-bit mono)
+    """
+
+    def __init__(self, latency_ms=400.0, latency_sigma=0.4, ttft_ms=150.0, tokens_per_s=400.0,
+                 error_rate=0.0, rate_limit_share=0.5, retry_after=0.2, transcription_ms=300.0,
+                 transcription_ms_per_s=0.0, reply=DEFAULT_REPLY, seed=None):
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.ttft_ms = ttft_ms
+        self.tokens_per_s = tokens_per_s
+        self.error_rate = error_rate
+        self.rate_limit_share = rate_limit_share
+        self.retry_after = retry_after
+        self.transcription_ms = transcription_ms
+        self.transcription_ms_per_s = transcription_ms_per_s
+        self.reply = reply
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.counts = {"chat": 0, "stream": 0, "transcription": 0, "errors": 0}
+
+    def sample_seconds(self, median_ms):
+        with self.lock:
+            return median_ms / 1000.0 * self.rng.lognormvariate(0.0, self.latency_sigma)
+
+    def sample_error(self):
+        """None, or the status code this request should fail with"""
+        with self.lock:
+            if self.rng.random() >= self.error_rate:
+                return None
+            return 429 if self.rng.random() < self.rate_limit_share else 503
+
+    def count(self, key):
+        with self.lock:
+            self.counts[key] += 1
+
+
+def _handler(config):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _send_json(self, status, payload, headers=None):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("content-type", "application/json")
+            self.send_header("content-length", str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _fail(self, status):
+            config.count("errors")
+            headers = {"retry-after": str(config.retry_after)} if status == 429 else {}
+            self._send_json(status, {"error": {"message": "simulated failure", "type": "fake"}}, headers)
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("content-length", 0)))
+            status = config.sample_error()
+            if self.path.endswith("/audio/transcriptions"):
+                config.count("transcription")
+                audio_seconds = len(body) / (2 * 16000)
+                time.sleep(config.sample_seconds(config.transcription_ms + config.transcription_ms_per_s * audio_seconds))
+                if status:
+                    return self._fail(status)
+                text = b"This is a transcribed answer from the load test."
+                self.send_response(200)
+                self.send_header("content-type", "text/plain")
+                self.send_header("content-length", str(len(text)))
+                self.end_headers()
+                self.wfile.write(text)
+                return
+            if not self.path.endswith("/chat/completions"):
+                return self._send_json(404, {"error": {"message": "not found"}})
+
+            request = json.loads(body or b"{}")
+            if request.get("stream"):
+                config.count("stream")
+                time.sleep(config.sample_seconds(config.ttft_ms))
+                if status:
+                    return self._fail(status)
+                return self._stream(request)
+
+            config.count("chat")
+            time.sleep(config.sample_seconds(config.latency_ms))
+            if status:
+                return self._fail(status)
+            words = len(config.reply.split())
+            self._send_json(200, {
+                "id": "fake", "object": "chat.completion", "created": int(time.time()), "model": request.get("model"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": config.reply}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": len(json.dumps(request.get("messages", []))) // 4,
+                          "completion_tokens": words, "total_tokens": words},
+            })
+
+        def _stream(self, request):
+            self.send_response(200)
+            self.send_header("content-type", "text/event-stream")
+            self.send_header("transfer-encoding", "chunked")
+            self.end_headers()
+
+            def write(data):
+                chunk = f"data: {data}\n\n".encode()
+                self.wfile.write(f"{len(chunk):x}\r\n".encode() + chunk + b"\r\n")
+                self.wfile.flush()
+
+            delay = 1.0 / config.tokens_per_s if config.tokens_per_s else 0.0
+            for word in config.reply.split(" "):
+                write(json.dumps({
+                    "id": "fake", "object": "chat.completion.chunk", "created": int(time.time()),
+                    "model": request.get("model"),
+                    "choices": [{"index": 0, "delta": {"content": word + " "}, "finish_reason": None}],
+                }))
+                time.sleep(delay)
+            write("[DONE]")
+            self.wfile.write(b"0\r\n\r\n")
+            self.wfile.flush()
+
+    return Handler
+
+
+def serve(config=None, host="127.0.0.1", port=0):
+    """Start the fake API in a background thread; returns (server, base_url)"""
+    server = ThreadingHTTPServer((host, port), _handler(config or FakeGroqConfig()))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="fake-groq", daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def add_arguments(parser):
+    parser.add_argument("--latency-ms", type=float, default=400.0, help="median non-streamed completion latency")
+    parser.add_argument("--latency-sigma", type=float, default=0.4, help="lognormal shape of all latencies")
+    parser.add_argument("--ttft-ms", type=float, default=150.0, help="median time to first streamed token")
+    parser.add_argument("--tokens-per-s", type=float, default=400.0, help="streaming speed")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests that fail")
+    parser.add_argument("--rate-limit-share", type=float, default=0.5, help="fraction of failures that are 429s")
+    parser.add_argument("--transcription-ms", type=float, default=300.0, help="median transcription latency")
+    parser.add_argument("--transcription-ms-per-s", type=float, default=0.0,
+                        help="extra transcription latency per second of uploaded audio")
+    parser.add_argument("--seed", type=int, default=None)
+
+
+def config_from_args(args):
+    return FakeGroqConfig(
+        latency_ms=args.latency_ms, latency_sigma=args.latency_sigma, ttft_ms=args.ttft_ms,
+        tokens_per_s=args.tokens_per_s, error_rate=args.error_rate, rate_limit_share=args.rate_limit_share,
+        transcription_ms=args.transcription_ms, transcription_ms_per_s=args.transcription_ms_per_s, seed=args.seed,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8400)
+    add_arguments(parser)
+    args = parser.parse_args()
+    server, url = serve(config_from_args(args), args.host, args.port)
+    print(f"Fake Groq API listening on {url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,175 @@
+"""
+End-of-interview feedback as a map-reduce over interview phases.
+
+Instead of one request over the whole transcript, the transcript is split into phases
+(intro, behavioral, coding, post-coding). Each phase is reviewed by its own short request,
+all running concurrently, and the phase notes are then merged into the final feedback.
+Every request stays small however long the interview ran, and the slowest phase - not the
+sum of all of them - sets the wait before the merge starts.
+"""
+
+import asyncio
+import time
+
+from conversation import estimate_tokens
+
+PHASES = ["intro", "behavioral", "coding", "post_coding"]
+PHASE_TITLES = {
+    "intro": "Introduction",
+    "behavioral": "Behavioral",
+    "coding": "Coding",
+    "post_coding": "Post-coding scenarios",
+}
+
+# Per-phase transcript budget; longer phases keep their opening and most recent messages
+PHASE_TOKEN_BUDGET = 2500
+
+LANGUAGE_CHOICES = {"Python", "Java", "C++"}
+CODING_RESULT_PREFIXES = ("**Attempt ", "✅ **Excellent work!**")
+
+PHASE_PROMPT = """
+You are reviewing one phase of a mock interview: {title}.
+Assess only what happens in this excerpt. Reply in exactly this format:
+Score: <1-5>/5
+Strengths:
+- <specific strength, with an example from the excerpt>
+Improvements:
+- <specific, actionable improvement>
+Use at most 3 bullets per list and stay under 120 words.
+"""
+
+MERGE_PROMPT = """
+You are Rachel, the interviewer, giving the candidate their final feedback.
+Below are your notes from each phase of the interview. Combine them into structured feedback:
+## Overall impression (2-3 sentences)
+## Strengths (bullets, each tied to a phase)
+## Areas to improve (bullets, each with a concrete suggestion)
+## Next steps (2-3 bullets)
+Speak to the candidate directly, warmly and honestly. Do not repeat the per-phase scores verbatim.
+"""
+
+
+def split_phases(messages):
+    """
+    Split the chat history into interview phases.
+    - intro: up to and including the candidate's first answer
+    - coding: from the language question to the candidate's answer to the follow-up after the
+      last test result (the complexity discussion belongs here)
+    - behavioral / post_coding: everything before / after the coding phase
+    Empty phases are omitted.
+    """
+    first_user = next((i for i, m in enumerate(messages) if m["role"] == "user"), None)
+    if first_user is None:
+        return {"intro": list(messages)} if messages else {}
+    intro_end = first_user + 1
+
+    coding = [
+        i for i, m in enumerate(messages)
+        if (m["role"] == "user" and m["content"] in LANGUAGE_CHOICES)
+        or (m["role"] == "assistant" and m["content"].startswith(CODING_RESULT_PREFIXES))
+    ]
+    if coding:
+        coding_start = max(coding[0] - 1, intro_end)
+        coding_end = min(coding[-1] + 3, len(messages))
+    else:
+        coding_start = coding_end = len(messages)
+
+    phases = {
+        "intro": messages[:intro_end],
+        "behavioral": messages[intro_end:coding_start],
+        "coding": messages[coding_start:coding_end],
+        "post_coding": messages[coding_end:],
+    }
+    return {phase: phase_messages for phase, phase_messages in phases.items() if phase_messages}
+
+
+def phase_transcript(messages, budget=PHASE_TOKEN_BUDGET):
+    """Transcript text for one phase; over budget, middle messages are dropped"""
+    lines = [f"{'Interviewer' if m['role'] == 'assistant' else 'Candidate'}: {m['content']}" for m in messages]
+    if sum(estimate_tokens(line) for line in lines) <= budget:
+        return "\n".join(lines)
+    head, tail, used = lines[:2], [], sum(estimate_tokens(line) for line in lines[:2])
+    for line in reversed(lines[2:]):
+        cost = estimate_tokens(line)
+        if used + cost > budget:
+            break
+        tail.insert(0, line)
+        used += cost
+    skipped = len(lines) - len(head) - len(tail)
+    return "\n".join(head + [f"[... {skipped} messages omitted ...]"] + tail)
+
+
+def review_messages(role_context, phase, messages, notes=""):
+    """Prompt for reviewing one phase (notes: extra facts, e.g. test results for coding)"""
+    content = f"Interview context:\n{role_context}\n\nExcerpt:\n{phase_transcript(messages)}"
+    if notes:
+        content += f"\n\nAdditional facts:\n{notes}"
+    return [
+        {"role": "system", "content": PHASE_PROMPT.format(title=PHASE_TITLES[phase])},
+        {"role": "user", "content": content},
+    ]
+
+
+def merge_messages(role_context, reviews, missing=()):
+    """Prompt for the reduce step over the phase reviews that succeeded (missing: phases that couldn't be reviewed)"""
+    notes = "\n\n".join(f"### {PHASE_TITLES[phase]}\n{text}" for phase, text in reviews.items())
+    if missing:
+        notes += (
+            "\n\nNot reviewed (the service was too busy): "
+            + ", ".join(PHASE_TITLES[phase] for phase in missing)
+            + ". Say so briefly instead of judging those phases."
+        )
+    return [
+        {"role": "system", "content": MERGE_PROMPT},
+        {"role": "user", "content": f"Interview context:\n{role_context}\n\nPhase notes:\n{notes}"},
+    ]
+
+
+async def _review(router, task, phase, messages, deadline=None):
+    start = time.perf_counter()
+    try:
+        text = await router.acomplete(messages, task=task, **({"deadline": deadline} if deadline else {}))
+        return phase, text, None, time.perf_counter() - start
+    except Exception as e:
+        return phase, None, e, time.perf_counter() - start
+
+
+def review_phases(router, task, prompts, on_review=None, concurrency=None, deadline=None):
+    """
+    Review every phase concurrently, as router calls of the given task (see router.py).
+    prompts maps phase -> review_messages(...).
+    on_review(phase, text, error, seconds) is called in completion order, from the calling
+    thread, so it can update the UI. Returns (reviews, errors, timings) keyed by phase;
+    timings also has "map" for the wall time of the whole step.
+    concurrency caps the reviews in flight (None: all at once); deadline is each review call's
+    limit in seconds, counted from its start (None: the client's default).
+    """
+    reviews, errors, timings = {}, {}, {}
+
+    async def run():
+        slots = asyncio.Semaphore(concurrency or max(len(prompts), 1))
+
+        async def review(phase, messages):
+            async with slots:
+                return await _review(router, task, phase, messages, deadline)
+
+        tasks = [review(phase, messages) for phase, messages in prompts.items()]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                phase, text, error, seconds = await next_done
+                timings[phase] = seconds
+                if error is None:
+                    reviews[phase] = text
+                else:
+                    errors[phase] = error
+                if on_review:
+                    on_review(phase, text, error, seconds)
+        finally:
+            await router.aclose()
+
+    start = time.perf_counter()
+    asyncio.run(run())
+    timings["map"] = time.perf_counter() - start
+    # Report phases in interview order, not completion order
+    reviews = {phase: reviews[phase] for phase in PHASES if phase in reviews}
+    return reviews, errors, timings
@@ -0,0 +1,229 @@
+"""
+Job-description digestion.
+
+A pasted job description used to be resent in full in the system prompt of every call. It is
+now processed once (per content hash, see JDCache) into:
+- a compact profile: the skills and tech stack it mentions, experience asked for, and its most
+  distinctive terms
+- an index of ~60-word chunks as L2-normalized TF-IDF vectors (NumPy)
+Each turn then carries the profile plus only the top-k chunks most similar to the current
+exchange, so prompt size stays about the same however long the description is.
+"""
+
+import hashlib
+import math
+import re
+import threading
+from collections import Counter, OrderedDict
+
+import numpy as np
+
+CHUNK_WORDS = 60
+TOP_K = 2
+MAX_SKILLS = 15
+MAX_KEYWORDS = 8
+
+TOKEN = re.compile(r"[a-z][a-z0-9+#]*(?:[.\-][a-z0-9+#]+)*")
+BLOCK_BREAK = re.compile(r"\n\s*\n|\n\s*(?:[-*•·▪●]|\d+[.)])\s+")
+SENTENCE_BREAK = re.compile(r"(?<=[.!?;])\s+|\n+")
+YEARS = re.compile(r"\b(\d{1,2})\s*\+?\s*(?:-\s*\d{1,2}\s*)?years?\b", re.IGNORECASE)
+
+STOPWORDS = frozenset("""
+a about above across after all also an and any are as at be been being both but by can
+could do does etc for from has have having how if in including into is it its just may
+more most must not of on or other our ours out over per plus should so some such than
+that the their them then there these they this those through to under up us using via
+was we well were what when where which while who will with within would you your
+ability able experience experienced strong good great excellent work working team teams
+role candidate candidates job position responsibilities requirements required preferred
+knowledge skills skill years year plus new help make ensure across based related
+""".split())
+
+# Skills and tools recognized for the profile (lowercase; multi-word entries matched as phrases)
+SKILLS = (
+    "python", "java", "c++", "c#", "javascript", "typescript", "go", "rust", "scala",
+    "kotlin", "swift", "ruby", "php", "r", "sql", "nosql", "html", "css", "bash",
+    "react", "angular", "vue", "node.js", "django", "flask", "fastapi", "spring", ".net",
+    "aws", "azure", "gcp", "docker", "kubernetes", "terraform", "linux", "git", "ci/cd",
+    "postgresql", "mysql", "mongodb", "redis", "kafka", "spark", "hadoop", "airflow", "snowflake",
+    "pandas", "numpy", "scikit-learn", "tensorflow", "pytorch", "machine learning", "deep learning",
+    "nlp", "computer vision", "statistics", "a/b testing", "data visualization", "tableau", "power bi",
+    "excel", "etl", "rest", "graphql", "microservices", "distributed systems", "system design",
+    "data structures", "algorithms", "testing", "agile", "scrum",
+    "communication", "leadership", "customer service", "negotiation", "crm", "salesforce",
+    "pos", "inventory", "merchandising", "cold calling", "lead generation", "account management",
+    "stakeholder management", "problem solving", "teamwork",
+)
+
+
+def _tech_context(word, qualifiers):
+    """word (case-sensitive) as an item of a list (", Go," "Go/") or followed by a qualifier ("Go developers")"""
+    listed = rf"(?:(?<=[,/(])|(?<=[,/(] )){word}(?![\w&'-])|\b{word}(?=\s*[,/)])"
+    return rf"{listed}|\b{word}\s+(?:{qualifiers})\b"
+
+
+# Skills that are also everyday words ("go the extra mile", "R&D", "the rest", "excel at",
+# "testing new displays") count only in these tech contexts
+CONTEXT_SKILLS = {
+    "go": re.compile(_tech_context("Go", "language|lang|programming|developers?|engineers?|services|microservices|modules")
+                     + r"|(?i:\bgolang\b)"),
+    "r": re.compile(_tech_context("R", "language|programming|packages|Shiny|Markdown") + r"|(?i:\brstudio\b)"),
+    "rest": re.compile(r"\bREST(?:ful)?\b|(?i:\brestful\b|\brest\s+apis?\b)"),
+    "excel": re.compile(r"\b(?:Microsoft|MS)\s+Excel\b|"
+                        + _tech_context("Excel", "spreadsheets?|formulas?|macros|VBA|pivot|skills|proficiency|dashboards?")),
+    "testing": re.compile(r"(?i:\b(?:unit|integration|automated|end-to-end|e2e|regression|load|performance|api|software)"
+                          r"\s+testing\b|\btest(?:ing)?\s+(?:automation|frameworks?)\b)"),
+    "spring": re.compile(_tech_context("Spring", "Boot|Framework|MVC|Cloud|Data|Security")),
+    "swift": re.compile(_tech_context("Swift", "language|programming|developers?") + r"|\bSwiftUI\b"),
+}
+
+
+def tokenize(text):
+    return [t for t in TOKEN.findall(text.lower()) if t not in STOPWORDS and len(t) > 1]
+
+
+def find_skills(text):
+    """Known skills mentioned in text, most mentioned first"""
+    lowered = f" {text.lower()} "
+    counts = {}
+    for skill in SKILLS:
+        if skill in CONTEXT_SKILLS:
+            n = len(CONTEXT_SKILLS[skill].findall(text))
+        else:
+            pattern = r"(?<![a-z0-9+#])" + re.escape(skill) + r"(?![a-z0-9+#])"
+            n = len(re.findall(pattern, lowered))
+        if n:
+            counts[skill] = n
+    return sorted(counts, key=lambda s: (-counts[s], SKILLS.index(s)))[:MAX_SKILLS]
+
+
+def split_chunks(text, chunk_words=CHUNK_WORDS):
+    """Paragraphs and bullets, merged or split at sentences into chunks of about chunk_words"""
+    sentences = []
+    for block in BLOCK_BREAK.split(text):
+        sentences.extend(s for s in (" ".join(p.split()) for p in SENTENCE_BREAK.split(block)) if s)
+    chunks, current, words = [], [], 0
+    for sentence in sentences:
+        n = len(sentence.split())
+        if current and words + n > chunk_words:
+            chunks.append(" ".join(current))
+            current, words = [], 0
+        current.append(sentence)
+        words += n
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+
+class JDIndex:
+    """Profile and TF-IDF chunk index of one job description"""
+
+    def __init__(self, text, chunk_words=CHUNK_WORDS):
+        self.chunks = split_chunks(text, chunk_words)
+        self.words = len(text.split())
+        counts = [Counter(tokenize(chunk)) for chunk in self.chunks]
+        vocab = sorted(set().union(*counts)) if counts else []
+        self.vocab = {term: i for i, term in enumerate(vocab)}
+
+        n = len(self.chunks)
+        df = np.zeros(len(vocab), dtype=np.float32)
+        tf = np.zeros((n, len(vocab)), dtype=np.float32)
+        for row, chunk_counts in enumerate(counts):
+            for term, count in chunk_counts.items():
+                tf[row, self.vocab[term]] = 1.0 + math.log(count)
+                df[self.vocab[term]] += 1
+        self.idf = (np.log((1.0 + n) / (1.0 + df)) + 1.0).astype(np.float32)
+        vectors = tf * self.idf
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        self.vectors = vectors / np.maximum(norms, 1e-9)
+
+        skills = find_skills(text)
+        self.profile = {
+            "title": self._title(text),
+            "skills": skills,
+            "years": self._years(text),
+            "keywords": self._keywords(counts, skills),
+        }
+
+    @staticmethod
+    def _title(text):
+        """A short first line followed by more text is taken as the position title"""
+        lines = [line.strip() for line in text.splitlines() if line.strip()]
+        return lines[0] if len(lines) > 1 and len(lines[0].split()) <= 8 else ""
+
+    @staticmethod
+    def _years(text):
+        years = [int(y) for y in YEARS.findall(text)]
+        return f"{min(years)}+ years" if years else ""
+
+    def _keywords(self, counts, skills):
+        """Most distinctive repeated terms of the description that aren't already listed as skills"""
+        total = Counter()
+        for chunk_counts in counts:
+            total.update(chunk_counts)
+        skill_words = {w for skill in skills for w in skill.split()}
+        scored = sorted(
+            ((count * self.idf[self.vocab[term]], term) for term, count in total.items()
+             if count > 1 and term not in skill_words),
+            reverse=True,
+        )
+        return [term for _, term in scored[:MAX_KEYWORDS]]
+
+    def profile_text(self):
+        parts = []
+        if self.profile["title"]:
+            parts.append(f"Position: {self.profile['title']}.")
+        if self.profile["skills"]:
+            parts.append(f"Skills and tech stack: {', '.join(self.profile['skills'])}.")
+        if self.profile["years"]:
+            parts.append(f"Experience asked for: {self.profile['years']}.")
+        if self.profile["keywords"]:
+            parts.append(f"Other key terms: {', '.join(self.profile['keywords'])}.")
+        return " ".join(parts)
+
+    def search(self, query, k=TOP_K):
+        """Up to k chunks most similar to query (cosine of TF-IDF vectors), in document order"""
+        if not self.chunks or k <= 0:
+            return []
+        q = np.zeros(len(self.vocab), dtype=np.float32)
+        for term, count in Counter(tokenize(query or "")).items():
+            i = self.vocab.get(term)
+            if i is not None:
+                q[i] = (1.0 + math.log(count)) * self.idf[i]
+        norm = np.linalg.norm(q)
+        if norm == 0:
+            return []
+        scores = self.vectors @ (q / norm)
+        top = [i for i in np.argsort(-scores)[:k] if scores[i] > 0]
+        return [self.chunks[i] for i in sorted(top)]
+
+    def context(self, query=None, k=TOP_K):
+        """Prompt text: the profile plus the chunks relevant to query"""
+        text = self.profile_text()
+        chunks = self.search(query, k) if query else []
+        if chunks:
+            text += "\nRelevant excerpts:\n" + "\n".join(f"- {chunk}" for chunk in chunks)
+        return text
+
+
+class JDCache:
+    """Digested job descriptions by content hash (LRU); safe to share between sessions"""
+
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, text):
+        key = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        with self._lock:
+            index = self._entries.get(key)
+            if index is not None:
+                self._entries.move_to_end(key)
+                return index
+        index = JDIndex(text)
+        with self._lock:
+            self._entries[key] = index
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return index
@@ -0,0 +1,387 @@
+"""
+Shared, resilient client layer for the Groq API.
+
+One LLMClient is shared by every session on a server (see get_llm in app.py). It keeps a tuned
+pool of HTTP connections, gives every call a deadline, retries 429/5xx/connection failures with
+exponential backoff and full jitter (honouring Retry-After), and can optionally hedge slow
+requests by sending a second copy once the first passes the observed p95 latency.
+With a scheduler (see scheduler.py), every attempt first waits for its share of the server's
+request and token budget, and a 429 pauses all sessions instead of just the one that hit it.
+Failures are raised as typed LLMError subclasses instead of being turned into chat replies.
+"""
+
+import asyncio
+import random
+import threading
+import time
+import weakref
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import groq
+import httpx
+from groq import AsyncGroq, Groq
+
+from conversation import estimate_message_tokens
+
+
+# ---- Errors ----
+class LLMError(Exception):
+    """A call to the model API failed"""
+    retryable = False
+
+    def __init__(self, message, status=None, retry_after=None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+class LLMTimeoutError(LLMError):
+    """No response within the call's deadline"""
+    retryable = True
+
+
+class LLMRateLimitError(LLMError):
+    """The API rejected the call with 429 (request or token rate limit)"""
+    retryable = True
+
+
+class LLMUnavailableError(LLMError):
+    """5xx response or the API could not be reached"""
+    retryable = True
+
+
+class LLMRequestError(LLMError):
+    """The request itself was rejected (bad request, auth, ...); retrying will not help"""
+
+
+class LLMStreamError(LLMError):
+    """A streamed reply broke off after tokens had already been delivered"""
+
+
+def _retry_after(response):
+    try:
+        return float(response.headers.get("retry-after"))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+def classify(exc):
+    """Map an SDK/HTTP exception onto the LLMError hierarchy"""
+    if isinstance(exc, LLMError):
+        return exc
+    if isinstance(exc, (groq.APITimeoutError, httpx.TimeoutException)):
+        return LLMTimeoutError("The model API timed out.")
+    if isinstance(exc, groq.APIStatusError):
+        status = exc.status_code
+        retry_after = _retry_after(exc.response)
+        if status == 429:
+            return LLMRateLimitError("The model API is rate limiting requests.", status, retry_after)
+        if status >= 500 or status == 408:
+            return LLMUnavailableError(f"The model API returned {status}.", status, retry_after)
+        return LLMRequestError(f"The model API rejected the request ({status}): {exc.message}", status)
+    if isinstance(exc, (groq.APIConnectionError, httpx.TransportError)):
+        return LLMUnavailableError("Could not connect to the model API.")
+    return LLMError(f"Unexpected model API error: {exc}")
+
+
+# ---- Latency tracking ----
+class LatencyTracker:
+    """Recent call latencies, used to decide when to hedge"""
+
+    def __init__(self, window=200, min_samples=20):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.min_samples = min_samples
+
+    def record(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, q):
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+# ---- Client ----
+class LLMClient:
+    """
+    Thread-safe Groq wrapper shared across sessions.
+    - deadline: default seconds a call may take in total, retries included
+    - max_attempts / backoff_base / backoff_max: retry policy for retryable errors
+    - hedge: send a backup request when the first one passes the p95 latency
+    - scheduler: optional RateScheduler shared by all callers; calls take a priority
+      (0 = live, see scheduler.py) and are queued per budget ("chat" or "audio") and model
+    """
+
+    def __init__(self, api_key=None, base_url=None, deadline=30.0, connect_timeout=5.0,
+                 max_connections=64, max_keepalive=32, keepalive_expiry=60.0,
+                 max_attempts=4, backoff_base=0.5, backoff_max=8.0, hedge=False, scheduler=None):
+        self.deadline = deadline
+        self.scheduler = scheduler
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge = hedge
+        self._api_key = api_key
+        self._base_url = base_url
+        self._limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self._timeout = httpx.Timeout(deadline, connect=connect_timeout)
+        # SDK retries are disabled: retries here are deadline-aware and jittered
+        self._client = Groq(
+            api_key=api_key, base_url=base_url, max_retries=0,
+            http_client=httpx.Client(limits=self._limits, timeout=self._timeout),
+        )
+        self._async_clients = weakref.WeakKeyDictionary()
+        self._hedge_pool = ThreadPoolExecutor(max_workers=max_connections, thread_name_prefix="llm-hedge")
+        self.latency = LatencyTracker()
+        self._stats_lock = threading.Lock()
+        self._stats = {"calls": 0, "retries": 0, "errors": 0, "hedges": 0, "hedge_wins": 0}
+
+    def _count(self, key, n=1):
+        with self._stats_lock:
+            self._stats[key] += n
+
+    def stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["p95_seconds"] = self.latency.percentile(0.95)
+        return stats
+
+    def _backoff(self, attempt, retry_after=None):
+        """Exponential backoff with full jitter; never sooner than the server's Retry-After"""
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1)))
+        if retry_after:
+            delay = max(delay, retry_after)
+        return delay
+
+    # ---- Scheduling ----
+    def _ticket(self, budget, model, tokens, priority):
+        """What the scheduler needs to admit each attempt of a call (None without a scheduler)"""
+        if self.scheduler is None:
+            return None
+        return (budget, model, tokens, priority, self.scheduler.current_session())
+
+    def _admit(self, ticket, remaining):
+        """Wait for the call's turn; raises SchedulerBusyError if it doesn't come in time"""
+        if ticket is not None:
+            budget, model, tokens, priority, session = ticket
+            try:
+                self.scheduler.acquire(budget, tokens, priority, session, timeout=remaining, model=model)
+            except LLMError:
+                self._count("errors")
+                raise
+
+    def _rate_limited(self, ticket, error):
+        if ticket is not None and isinstance(error, LLMRateLimitError):
+            self.scheduler.rate_limited(ticket[0], error.retry_after, model=ticket[1])
+
+    def _chat_ticket(self, messages, model, max_tokens, priority):
+        # Token budgets count the reply too; without max_tokens assume a typical reply
+        return self._ticket("chat", model, estimate_message_tokens(messages) + (max_tokens or 256), priority)
+
+    # ---- Sync ----
+    def _call(self, fn, deadline, ticket=None):
+        """Run fn(timeout) with retries until it succeeds, fails permanently or the deadline passes"""
+        end = time.monotonic() + deadline
+        attempt = 0
+        while True:
+            remaining = end - time.monotonic()
+            if remaining <= 0:
+                self._count("errors")
+                raise LLMTimeoutError(f"No response from the model API within {deadline:g}s.")
+            self._admit(ticket, remaining)
+            start = time.monotonic()
+            try:
+                result = fn(max(end - start, 0.1))
+                self.latency.record(time.monotonic() - start)
+                return result
+            except Exception as e:
+                error = classify(e)
+                self._rate_limited(ticket, error)
+                attempt += 1
+                delay = self._backoff(attempt, error.retry_after)
+                if not error.retryable or attempt >= self.max_attempts or time.monotonic() + delay >= end:
+                    self._count("errors")
+                    raise error from e
+                self._count("retries")
+                time.sleep(delay)
+
+    def _hedged(self, fn, deadline, ticket=None):
+        """Like _call, but fire a backup request if the first is slower than the p95 latency"""
+        p95 = self.latency.percentile(0.95)
+        if p95 is None or p95 >= deadline:
+            return self._call(fn, deadline, ticket)
+        first = self._hedge_pool.submit(self._call, fn, deadline, ticket)
+        done, _ = wait([first], timeout=p95)
+        if done:
+            return first.result()
+
+        self._count("hedges")
+        backup = self._hedge_pool.submit(self._call, fn, max(deadline - p95, 0.1), ticket)
+        pending = {first, backup}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is backup:
+                        self._count("hedge_wins")
+                    # The slower request is left to finish in the background and discarded
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def complete(self, messages, model, temperature=0.7, max_tokens=None, deadline=None, hedge=None, priority=0):
+        """Return the reply text for a chat completion; raises LLMError"""
+        self._count("calls")
+        extra = {"max_tokens": max_tokens} if max_tokens else {}
+        ticket = self._chat_ticket(messages, model, max_tokens, priority)
+
+        def request(timeout):
+            response = self._client.chat.completions.create(
+                model=model, messages=messages, temperature=temperature, timeout=timeout, **extra,
+            )
+            return response.choices[0].message.content
+
+        deadline = deadline or self.deadline
+        if self.hedge if hedge is None else hedge:
+            return self._hedged(request, deadline, ticket)
+        return self._call(request, deadline, ticket)
+
+    def stream(self, messages, model, temperature=0.7, max_tokens=None, deadline=None, priority=0):
+        """
+        Yield reply tokens as they arrive. Opening the stream is retried like any other call;
+        once tokens have been delivered a failure raises LLMStreamError instead.
+        """
+        self._count("calls")
+        extra = {"max_tokens": max_tokens} if max_tokens else {}
+
+        def open_stream(timeout):
+            return self._client.chat.completions.create(
+                model=model, messages=messages, temperature=temperature, stream=True, timeout=timeout, **extra,
+            )
+
+        ticket = self._chat_ticket(messages, model, max_tokens, priority)
+        response = self._call(open_stream, deadline or self.deadline, ticket)
+        try:
+            for chunk in response:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    yield delta
+        except Exception as e:
+            self._count("errors")
+            raise LLMStreamError("The reply was interrupted before it finished.") from e
+
+    def transcribe(self, file, model="whisper-large-v3", language="en", deadline=None, priority=0):
+        """Transcribe an audio file (path/bytes tuple as accepted by the SDK); raises LLMError"""
+        self._count("calls")
+
+        def request(timeout):
+            result = self._client.audio.transcriptions.create(
+                file=file, model=model, response_format="text", language=language, timeout=timeout,
+            )
+            return result if isinstance(result, str) else getattr(result, "text", "")
+
+        return self._call(request, deadline or self.deadline, self._ticket("audio", model, 0, priority))
+
+    # ---- Async ----
+    def async_client(self):
+        """One AsyncGroq per event loop (httpx async pools can't be shared between loops)"""
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            client = AsyncGroq(
+                api_key=self._api_key, base_url=self._base_url, max_retries=0,
+                http_client=httpx.AsyncClient(limits=self._limits, timeout=self._timeout),
+            )
+            self._async_clients[loop] = client
+        return client
+
+    async def aclose(self):
+        """Close the running event loop's async client (call before the loop ends)"""
+        client = self._async_clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.close()
+
+    async def _acall(self, fn, deadline, ticket=None):
+        end = time.monotonic() + deadline
+        attempt = 0
+        while True:
+            remaining = end - time.monotonic()
+            if remaining <= 0:
+                self._count("errors")
+                raise LLMTimeoutError(f"No response from the model API within {deadline:g}s.")
+            if ticket is not None:
+                await asyncio.to_thread(self._admit, ticket, remaining)
+            start = time.monotonic()
+            try:
+                result = await fn(max(end - start, 0.1))
+                self.latency.record(time.monotonic() - start)
+                return result
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                error = classify(e)
+                self._rate_limited(ticket, error)
+                attempt += 1
+                delay = self._backoff(attempt, error.retry_after)
+                if not error.retryable or attempt >= self.max_attempts or time.monotonic() + delay >= end:
+                    self._count("errors")
+                    raise error from e
+                self._count("retries")
+                await asyncio.sleep(delay)
+
+    async def _ahedged(self, fn, deadline, ticket=None):
+        p95 = self.latency.percentile(0.95)
+        if p95 is None or p95 >= deadline:
+            return await self._acall(fn, deadline, ticket)
+        first = asyncio.ensure_future(self._acall(fn, deadline, ticket))
+        done, _ = await asyncio.wait({first}, timeout=p95)
+        if done:
+            return first.result()
+
+        self._count("hedges")
+        backup = asyncio.ensure_future(self._acall(fn, max(deadline - p95, 0.1), ticket))
+        pending = {first, backup}
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is backup:
+                            self._count("hedge_wins")
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def acomplete(self, messages, model, temperature=0.7, max_tokens=None, deadline=None, hedge=None, priority=0):
+        """Async variant of complete(), for running several independent calls concurrently"""
+        self._count("calls")
+        client = self.async_client()
+        extra = {"max_tokens": max_tokens} if max_tokens else {}
+        ticket = self._chat_ticket(messages, model, max_tokens, priority)
+
+        async def request(timeout):
+            response = await client.chat.completions.create(
+                model=model, messages=messages, temperature=temperature, timeout=timeout, **extra,
+            )
+            return response.choices[0].message.content
+
+        deadline = deadline or self.deadline
+        if self.hedge if hedge is None else hedge:
+            return await self._ahedged(request, deadline, ticket)
+        return await self._acall(request, deadline, ticket)
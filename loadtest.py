@@ -0,0 +1,249 @@
+"""
+Headless load test and latency benchmark for the interview app.
+
+Each simulated candidate goes through a whole interview - start, chat turns, language
+selection, code submission and feedback - by driving app.py with Streamlit's AppTest, against
+a local fake Groq API (fake_groq.py) with configurable latency and errors. Results are
+written as JSON (per-phase p50/p95/p99, throughput, memory per session) so runs can be
+compared before and after a change:
+
+    python loadtest.py --sessions 50 --concurrency 8 --out after.json --baseline before.json
+
+AppTest keeps process-global state and can't run two scripts at once in one process, so
+concurrency comes from worker processes. Each worker plays the role of one app server:
+it runs its sessions one script run at a time and shares its process-wide caches between them.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import pickle
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import fake_groq
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+
+SOLUTION = "def sum_array(arr):\n    return sum(arr)"
+ANSWERS = [
+    "Hi, I'm Alex. I've spent three years building backend services and I enjoy performance work.",
+    "On my last project I led the migration of our payments API to a new database with zero downtime.",
+    "We disagreed about the rollout plan, so I wrote up both options with their risks and we picked one together.",
+    "I'd first reproduce the bug reliably, then bisect recent changes and add a regression test.",
+    "It's O(n) time and O(1) extra space, since it touches every element once.",
+    "I'd tell my manager early, re-plan the scope and make sure the critical path ships first.",
+]
+
+
+# ---- Worker side ----
+_sessions_run = 0  # per worker process; the first session also pays for imports and caches
+def _rss_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _state_bytes(state):
+    """Approximate serialized size of a session's state"""
+    total = 0
+    for value in state.values():
+        try:
+            total += len(pickle.dumps(value))
+        except Exception:
+            # e.g. objects holding functions defined in the app script
+            attrs = getattr(value, "__dict__", {})
+            total += len(pickle.dumps({k: v for k, v in attrs.items() if not callable(v)}))
+    return total
+
+
+def _click(at, label):
+    for button in at.button:
+        if label in button.label:
+            return button.click().run()
+    raise LookupError(f"no button labelled {label!r}")
+
+
+def _failed(at):
+    """Did the last script run end in an exception or an error message?"""
+    return bool(at.exception) or any("⚠️" in str(e.value) or "❌ Error" in str(e.value) for e in at.error)
+
+
+def run_session(index, turns, code, timeout):
+    """One full interview; returns per-phase latencies and failures plus memory figures"""
+    from streamlit.testing.v1 import AppTest
+
+    timings, errors = {}, {}
+    rss_before = _rss_bytes()
+
+    def step(phase, action):
+        start = time.perf_counter()
+        try:
+            at = action()
+            failed = _failed(at)
+        except Exception:
+            at, failed = None, True
+        timings.setdefault(phase, []).append(time.perf_counter() - start)
+        if failed:
+            errors[phase] = errors.get(phase, 0) + 1
+        return at
+
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    step("load", at.run)
+    step("start", lambda: _click(at, "Start"))
+    for turn in range(turns):
+        answer = ANSWERS[(index + turn) % len(ANSWERS)]
+        step("chat_turn", lambda: at.chat_input[0].set_value(answer).run())
+    if code:
+        step("language", lambda: _click(at, "Python"))
+        at.session_state.code = SOLUTION
+        step("submit_code", lambda: _click(at, "Run Code"))
+    step("feedback", lambda: _click(at, "End Interview"))
+
+    global _sessions_run
+    _sessions_run += 1
+    return {
+        "timings": timings,
+        "errors": errors,
+        "state_bytes": _state_bytes(at.session_state.filtered_state),
+        "rss_delta_bytes": _rss_bytes() - rss_before,
+        "warm": _sessions_run > 1,
+    }
+
+
+def _worker(args):
+    return run_session(*args)
+
+
+def _init_worker(env):
+    os.environ.update(env)
+    sys.path.insert(0, os.path.dirname(APP_PATH))
+    os.chdir(os.path.dirname(APP_PATH))
+
+
+# ---- Report ----
+def summarize_phase(samples, failures):
+    values = np.asarray(samples, dtype=np.float64)
+    return {
+        "count": int(values.size),
+        "errors": int(failures),
+        "p50": float(np.percentile(values, 50)),
+        "p95": float(np.percentile(values, 95)),
+        "p99": float(np.percentile(values, 99)),
+        "mean": float(values.mean()),
+        "max": float(values.max()),
+    }
+
+
+def build_report(results, config, wall_seconds, server_counts):
+    phases = {}
+    for result in results:
+        for phase, samples in result["timings"].items():
+            phases.setdefault(phase, []).extend(samples)
+    failures = {phase: sum(r["errors"].get(phase, 0) for r in results) for phase in phases}
+    turns = sum(len(samples) for samples in phases.values()) - len(phases.get("load", []))
+    # Memory growth is only meaningful once a worker's imports and shared caches are in place
+    warm = [r for r in results if r["warm"]] or results
+    return {
+        "config": config,
+        "sessions": len(results),
+        "wall_seconds": wall_seconds,
+        "throughput": {
+            "sessions_per_minute": len(results) / wall_seconds * 60,
+            "turns_per_second": turns / wall_seconds,
+        },
+        "phases": {phase: summarize_phase(samples, failures[phase]) for phase, samples in phases.items()},
+        "memory": {
+            "state_kb_per_session": float(np.mean([r["state_bytes"] for r in results])) / 1024,
+            "rss_kb_per_session": float(np.median([r["rss_delta_bytes"] for r in warm])) / 1024,
+        },
+        "api_requests": server_counts,
+    }
+
+
+def compare(report, baseline):
+    """Relative change of the key figures against an earlier report (positive = slower/bigger)"""
+    delta = {"phases": {}}
+    for phase, stats in report["phases"].items():
+        before = baseline.get("phases", {}).get(phase)
+        if before:
+            delta["phases"][phase] = {
+                q: (stats[q] - before[q]) / before[q] if before[q] else None for q in ("p50", "p95", "p99")
+            }
+    for key in ("state_kb_per_session", "rss_kb_per_session"):
+        before = baseline.get("memory", {}).get(key)
+        delta[key] = (report["memory"][key] - before) / before if before else None
+    before = baseline.get("throughput", {}).get("sessions_per_minute")
+    delta["sessions_per_minute"] = (
+        (report["throughput"]["sessions_per_minute"] - before) / before if before else None
+    )
+    return delta
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless load test for the interview app")
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=4, help="worker processes running sessions")
+    parser.add_argument("--turns", type=int, default=4, help="chat turns per session before coding")
+    parser.add_argument("--no-code", action="store_true", help="skip the coding round")
+    parser.add_argument("--timeout", type=float, default=120.0, help="seconds allowed per script run")
+    parser.add_argument("--base-url", default=None, help="use this API instead of starting the fake one")
+    parser.add_argument("--out", default=None, help="write the JSON report here (default: stdout)")
+    parser.add_argument("--baseline", default=None, help="earlier report to compare against")
+    parser.add_argument("--rpm", type=int, default=0, help="LLM_RPM of each app process (0: no limit)")
+    parser.add_argument("--tpm", type=int, default=0, help="LLM_TPM of each app process (0: no limit)")
+    fake_groq.add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    server_config = None
+    base_url = args.base_url
+    if base_url is None:
+        server_config = fake_groq.config_from_args(args)
+        _, base_url = fake_groq.serve(server_config)
+
+    workdir = tempfile.mkdtemp(prefix="loadtest-")
+    env = {
+        "GROQ_BASE_URL": base_url,
+        "GROQ_API_KEY": os.environ.get("GROQ_API_KEY", "fake") if args.base_url else "fake",
+        "SESSION_DB": os.path.join(workdir, "sessions.db"),
+        "LLM_RPM": str(args.rpm),
+        "LLM_TPM": str(args.tpm),
+        "AUDIO_RPM": str(args.rpm),
+    }
+
+    config = {k: v for k, v in vars(args).items() if k not in ("out", "baseline")}
+    jobs = [(i, args.turns, not args.no_code, args.timeout) for i in range(args.sessions)]
+    # Executor workers (unlike multiprocessing.Pool's daemonic ones) may start the app's sandbox
+    # processes. Functions are passed by module name: AppTest replaces __main__ in the workers.
+    import loadtest
+    ctx = multiprocessing.get_context("spawn")
+    start = time.perf_counter()
+    with ProcessPoolExecutor(
+        args.concurrency, mp_context=ctx, initializer=loadtest._init_worker, initargs=(env,)
+    ) as pool:
+        results = list(pool.map(loadtest._worker, jobs))
+    wall_seconds = time.perf_counter() - start
+
+    report = build_report(results, config, wall_seconds, dict(server_config.counts) if server_config else None)
+    if args.baseline:
+        with open(args.baseline) as f:
+            report["delta"] = compare(report, json.load(f))
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""
+HTTP endpoint for synthesized speech.
+
+Clips used to be sent inline as base64 data URIs: a third larger than the MP3, carried in the
+websocket delta and kept in the DOM, and downloaded again every time the same phrase is
+spoken. Instead, the page now gets a URL addressed by the clip's content hash
+(/tts/<key>.mp3), served from the TTS cache with immutable caching headers, ETags and HTTP
+range requests, so the browser fetches each clip once and can seek within it.
+
+With the optional soundfile package (libsndfile >= 1.1), clips are also available as Ogg
+Opus at speech bitrates (/tts/<key>.opus), about half the size of gTTS's MP3; the page picks
+it when the browser can play it. Playback speed is applied in the browser either way.
+"""
+
+import io
+import re
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+try:
+    import soundfile
+except ImportError:  # optional: Opus transcoding
+    soundfile = None
+
+CONTENT_TYPES = {"mp3": "audio/mpeg", "opus": "audio/ogg; codecs=opus"}
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+PATH = re.compile(r"^/tts/([0-9a-f]{64})\.(mp3|opus)$")
+RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+OPUS_QUALITY = 0.9  # libsndfile compression level (0-1, higher is smaller); ~24 kbit/s mono speech
+
+
+def opus_available():
+    if soundfile is None:
+        return False
+    return "MP3" in soundfile.available_formats() and "OPUS" in soundfile.available_subtypes("OGG")
+
+
+def transcode_opus(mp3, quality=OPUS_QUALITY):
+    """Ogg Opus bytes for an MP3 clip"""
+    samples, rate = soundfile.read(io.BytesIO(mp3), dtype="float32")
+    buf = io.BytesIO()
+    soundfile.write(buf, samples, rate, format="OGG", subtype="OPUS", compression_level=quality)
+    return buf.getvalue()
+
+
+def parse_range(header, size):
+    """(start, end) inclusive for a single-range Range header; None to send the whole body, or "invalid" """
+    match = RANGE.match(header.strip()) if header else None
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return "invalid"
+    if not first:   # suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            return "invalid"
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return "invalid"
+    return start, end
+
+
+class MediaServer:
+    """
+    Serves clips of a TTSCache by key.
+    - opus: also serve Ogg Opus versions, transcoded on first use and kept in a bounded LRU
+    """
+
+    def __init__(self, cache, host="127.0.0.1", port=0, opus=False, max_opus_bytes=8 * 1024 * 1024):
+        self.cache = cache
+        self.opus = opus and opus_available()
+        self.max_opus_bytes = max_opus_bytes
+        self._opus = OrderedDict()
+        self._opus_size = 0
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "ranges": 0, "not_modified": 0, "not_found": 0, "bytes_sent": 0}
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        threading.Thread(target=self.server.serve_forever, name="media", daemon=True).start()
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self._stats[key] += amount
+
+    def opus_clip(self, key, mp3):
+        """Opus bytes for the clip, transcoding (once) if needed"""
+        with self._lock:
+            data = self._opus.get(key)
+            if data is not None:
+                self._opus.move_to_end(key)
+                return data
+        data = transcode_opus(mp3)
+        with self._lock:
+            if key not in self._opus:
+                self._opus[key] = data
+                self._opus_size += len(data)
+                while self._opus_size > self.max_opus_bytes and len(self._opus) > 1:
+                    _, old = self._opus.popitem(last=False)
+                    self._opus_size -= len(old)
+        return data
+
+    def clip(self, key, ext):
+        mp3 = self.cache.get(key, count=False)
+        if mp3 is None or ext == "mp3":
+            return mp3
+        if not self.opus:
+            return None
+        return self.opus_clip(key, mp3)
+
+    def sizes(self, key, mp3):
+        """Bytes the browser downloads for a clip, per format offered"""
+        sizes = {"mp3": len(mp3)}
+        if self.opus:
+            sizes["opus"] = len(self.opus_clip(key, mp3))
+        return sizes
+
+    def _handler(self):
+        media = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _empty(self, status, headers=None):
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header("content-length", "0")
+                self.end_headers()
+
+            def do_HEAD(self):
+                self._serve(body=False)
+
+            def do_GET(self):
+                self._serve(body=True)
+
+            def _serve(self, body):
+                media._count("requests")
+                match = PATH.match(self.path.split("?", 1)[0])
+                data = media.clip(*match.groups()) if match else None
+                if data is None:
+                    media._count("not_found")
+                    return self._empty(404)
+
+                key, ext = match.groups()
+                etag = f'"{key}.{ext}"'
+                headers = {
+                    "cache-control": CACHE_CONTROL,
+                    "etag": etag,
+                    "accept-ranges": "bytes",
+                }
+                if etag in self.headers.get("if-none-match", ""):
+                    media._count("not_modified")
+                    return self._empty(304, headers)
+
+                size = len(data)
+                span = parse_range(self.headers.get("range"), size)
+                if span == "invalid":
+                    return self._empty(416, dict(headers, **{"content-range": f"bytes */{size}"}))
+                status, start, end = 200, 0, size - 1
+                if span is not None:
+                    media._count("ranges")
+                    status, (start, end) = 206, span
+                    headers["content-range"] = f"bytes {start}-{end}/{size}"
+
+                self.send_response(status)
+                self.send_header("content-type", CONTENT_TYPES[ext])
+                self.send_header("content-length", str(end - start + 1))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                if body:
+                    self.wfile.write(data[start:end + 1])
+                    media._count("bytes_sent", end - start + 1)
+
+        return Handler
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, opus=self.opus, opus_entries=len(self._opus))
+
+    def shutdown(self):
+        self.server.shutdown()
@@ -0,0 +1,153 @@
+"""
+Cache of pre-generated interview openers.
+
+The opener only depends on (role, level, company, job description), so it can be generated
+ahead of time. Each configuration keeps a small pool of varied openers; serving one removes
+it from the pool and queues a background refill, so repeat configurations start instantly
+without every candidate getting the identical greeting. Entries expire after a TTL and the
+number of configurations is bounded (least recently used first out).
+"""
+
+import hashlib
+import threading
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+def normalize_profile(role, level, company="", jd=""):
+    """Canonical form of an interview configuration (case/whitespace-insensitive company and JD)"""
+    return (
+        role.strip(),
+        level.strip(),
+        " ".join(company.split()).lower(),
+        " ".join(jd.split()),
+    )
+
+
+def profile_key(role, level, company="", jd=""):
+    return hashlib.sha256("\x1f".join(normalize_profile(role, level, company, jd)).encode()).hexdigest()
+
+
+class OpenerCache:
+    """
+    Thread-safe pool of openers per profile key.
+    - generate(profile) -> str produces one opener (profile is the dict passed to take/warm)
+    - pool_size: openers kept ready per configuration
+    - ttl: seconds an opener stays servable
+    - max_keys: configurations remembered before the least recently used is dropped
+    """
+
+    def __init__(self, generate, pool_size=3, ttl=3600.0, max_keys=256, workers=2, popular_refill=8):
+        self.generate = generate
+        self.pool_size = pool_size
+        self.ttl = ttl
+        self.max_keys = max_keys
+        self.popular_refill = popular_refill
+        self._pools = OrderedDict()   # key -> [(created, text)]
+        self._pending = Counter()      # key -> generations in flight
+        self._requests = Counter()     # key -> times Start was clicked for it
+        self._profiles = {}            # key -> profile, so popular keys can be re-warmed
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="opener")
+        self.hits = 0
+        self.misses = 0
+        self.generated = 0
+        self.expired = 0
+        self.errors = 0
+
+    @staticmethod
+    def key(profile):
+        return profile_key(profile["role"], profile["level"], profile.get("company", ""), profile.get("jd", ""))
+
+    def _fresh(self, key, now):
+        """Drop expired openers for key (lock held); returns the remaining pool"""
+        pool = self._pools.get(key, [])
+        live = [(created, text) for created, text in pool if now - created < self.ttl]
+        self.expired += len(pool) - len(live)
+        if key in self._pools:
+            self._pools[key] = live
+        return live
+
+    def take(self, profile):
+        """Pop a ready opener for this configuration (None on a miss); the pool refills in the background"""
+        key = self.key(profile)
+        with self._lock:
+            self._requests[key] += 1
+            if len(self._requests) > 4 * self.max_keys:
+                self._requests = Counter(dict(self._requests.most_common(self.max_keys)))
+            pool = self._fresh(key, time.time())
+            opener = pool.pop(0)[1] if pool else None
+            if opener is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._pools.move_to_end(key)
+        self.warm(profile)
+        return opener
+
+    def warm(self, profile, count=None):
+        """Queue generations until the pool for this configuration holds `count` openers"""
+        key = self.key(profile)
+        target = self.pool_size if count is None else count
+        with self._lock:
+            self._profiles[key] = dict(profile)
+            if len(self._profiles) > 4 * self.max_keys:
+                keep = set(self._pools) | set(self._requests) | {key}
+                self._profiles = {k: p for k, p in self._profiles.items() if k in keep}
+            missing = target - len(self._fresh(key, time.time())) - self._pending[key]
+            self._pending[key] += max(missing, 0)
+        for _ in range(max(missing, 0)):
+            self._executor.submit(self._fill, key, dict(profile))
+
+    def warm_popular(self):
+        """Top up the most requested configurations, replacing openers that have expired"""
+        with self._lock:
+            keys = [key for key, _ in self._requests.most_common(self.popular_refill)]
+            profiles = [self._profiles[key] for key in keys if key in self._profiles]
+        for profile in profiles:
+            self.warm(profile)
+
+    def start_refresher(self, interval):
+        """Daemon thread that re-warms popular configurations every `interval` seconds"""
+        def loop():
+            while True:
+                time.sleep(interval)
+                self.warm_popular()
+        threading.Thread(target=loop, name="opener-refresher", daemon=True).start()
+
+    def _finished(self, key):
+        self._pending[key] -= 1
+        if self._pending[key] <= 0:
+            del self._pending[key]
+
+    def _fill(self, key, profile):
+        try:
+            text = self.generate(profile)
+        except Exception:
+            with self._lock:
+                self.errors += 1
+                self._finished(key)
+            return
+        with self._lock:
+            self._finished(key)
+            self.generated += 1
+            self._pools.setdefault(key, []).append((time.time(), text))
+            self._pools.move_to_end(key)
+            while len(self._pools) > self.max_keys:
+                old, _ = self._pools.popitem(last=False)
+                self._profiles.pop(old, None)
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "generated": self.generated,
+                "expired": self.expired,
+                "errors": self.errors,
+                "configurations": len(self._pools),
+                "ready": sum(len(pool) for pool in self._pools.values()),
+            }
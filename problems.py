@@ -0,0 +1,282 @@
+"""
+Coding problem registry.
+
+Each problem defines its signature, starter code per language, hand-written edge cases,
+a reference solution and a seeded generator for large inputs. Large inputs are generated
+lazily on first use, their expected outputs computed with the reference solution in one
+batch, and the resulting suite is cached for the life of the process - so adding a
+10^5-element test costs one generator line.
+"""
+
+import threading
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+PREVIEW_ITEMS = 8
+
+
+def preview(value, max_items=PREVIEW_ITEMS):
+    """Short display form of a test value (large arrays are abbreviated)"""
+    if isinstance(value, tuple):
+        return "(" + ", ".join(preview(v, max_items) for v in value) + ")"
+    if isinstance(value, list) and len(value) > max_items:
+        head = ", ".join(str(v) for v in value[:max_items])
+        return f"[{head}, ... ({len(value)} items)]"
+    return str(value) if not isinstance(value, str) else value
+
+
+@dataclass
+class Problem:
+    id: str
+    title: str
+    description: str
+    params: List[str]                   # runner types: "int", "long", "bool", "int[]"
+    returns: str
+    names: Dict[str, str]               # function name per language
+    starter: Dict[str, str]             # starter code per language
+    edge_cases: List[Tuple[tuple, object]]
+    reference: Callable
+    generate: Callable                  # generate(rng, size) -> args tuple
+    large_sizes: List[int] = field(default_factory=list)
+    check: Optional[Callable] = None    # check(args, expected, output) -> bool; default equality
+    profile_generate: Optional[Callable] = None  # worst-case inputs for profiling; default generate
+    hints: List[str] = field(default_factory=list)
+    solutions: Dict[str, str] = field(default_factory=dict)  # solution shown after the last attempt, per language
+    seed: int = 0
+
+    def __post_init__(self):
+        self._generated = None
+        self._lock = threading.Lock()
+
+    @property
+    def signature(self):
+        return {
+            "params": self.params,
+            "returns": self.returns,
+            "java_name": self.names["Java"],
+            "cpp_name": self.names["C++"],
+        }
+
+    def generated_tests(self):
+        """Large seeded tests, generated and checked against the reference on first use"""
+        with self._lock:
+            if self._generated is None:
+                rng = np.random.default_rng(self.seed)
+                inputs = [self.generate(rng, size) for size in self.large_sizes]
+                self._generated = [(args, self.reference(*args)) for args in inputs]
+            return self._generated
+
+    def profile_input(self, rng, size):
+        """Input used by the complexity profiler (worst case where the problem defines one)"""
+        return (self.profile_generate or self.generate)(rng, size)
+
+    def tests(self, include_large=True):
+        """Edge cases first (fast feedback), then the generated large-scale suite"""
+        tests = list(self.edge_cases)
+        if include_large:
+            tests += self.generated_tests()
+        return tests
+
+    def evaluate_python(self, sandbox, code):
+        """Run a Python submission against the full suite in a SandboxPool worker"""
+        return sandbox.run(code, self.names["Python"], self.tests(), check=self.check)
+
+
+# ---- Sum Array ----
+def _sum_reference(arr):
+    return int(np.sum(np.asarray(arr, dtype=np.int64)))
+
+
+def _sum_generate(rng, size):
+    return (rng.integers(-1000, 1001, size=size).tolist(),)
+
+
+# ---- Two Sum ----
+def _two_sum_reference(nums, target):
+    seen = {}
+    for i, x in enumerate(nums):
+        if target - x in seen:
+            return [seen[target - x], i]
+        seen[x] = i
+    return []
+
+
+def _two_sum_check(args, expected, output):
+    """Any pair of distinct indices adding up to target is correct"""
+    nums, target = args
+    try:
+        i, j = (int(v) for v in output)
+    except (TypeError, ValueError):
+        return False
+    return i != j and 0 <= i < len(nums) and 0 <= j < len(nums) and nums[i] + nums[j] == target
+
+
+def _two_sum_generate(rng, size):
+    nums = rng.choice(np.arange(-10 * size, 10 * size), size=size, replace=False)
+    i, j = rng.choice(size, size=2, replace=False)
+    return (nums.tolist(), int(nums[i] + nums[j]))
+
+
+def _two_sum_worst_case(rng, size):
+    """The only valid pair is the last two elements, so no solution can stop early"""
+    nums = rng.choice(np.arange(0, 10 * size), size=size, replace=False)
+    nums[-2:] = [20 * size, 20 * size + 1]
+    return (nums.tolist(), 40 * size + 1)
+
+
+# ---- Contains Duplicate ----
+def _contains_duplicate_reference(nums):
+    return len(set(nums)) != len(nums)
+
+
+def _contains_duplicate_generate(rng, size):
+    nums = rng.choice(np.arange(-10 * size, 10 * size), size=size, replace=False)
+    if rng.random() < 0.5:
+        i, j = rng.choice(size, size=2, replace=False)
+        nums[j] = nums[i]
+    return (nums.tolist(),)
+
+
+def _contains_duplicate_worst_case(rng, size):
+    """All values distinct, so every element has to be examined"""
+    return (rng.choice(np.arange(-10 * size, 10 * size), size=size, replace=False).tolist(),)
+
+
+PROBLEMS = {
+    "sum_array": Problem(
+        id="sum_array",
+        title="Sum Array",
+        description="Write a function `sum_array` that takes an array of integers and returns their sum.",
+        params=["int[]"],
+        returns="long",
+        names={"Python": "sum_array", "Java": "sumArray", "C++": "sumArray"},
+        starter={
+            "Python": "def sum_array(arr):\n    # Write your code here\n    pass",
+            "Java": "public static long sumArray(int[] arr) {\n    // Write your code here\n    return 0;\n}",
+            "C++": "long long sumArray(vector<int>& arr) {\n    // Write your code here\n    return 0;\n}",
+        },
+        edge_cases=[
+            (([],), 0),
+            (([1, 2, 3],), 6),
+            (([-5, 5],), 0),
+            (([10],), 10),
+            (([0, 0, 0],), 0),
+        ],
+        reference=_sum_reference,
+        generate=_sum_generate,
+        large_sizes=[1000, 100000],
+        hints=[
+            "Make sure you're handling all edge cases, including empty arrays.",
+            "Try using a loop to iterate through the array and accumulate the sum. Initialize your sum variable to 0.",
+        ],
+        solutions={
+            "Python": "def sum_array(arr):\n    return sum(arr)",
+            "Java": "public static long sumArray(int[] arr) {\n    long sum = 0;\n    for (int x : arr) {\n        sum += x;\n    }\n    return sum;\n}",
+            "C++": "long long sumArray(vector<int>& arr) {\n    long long sum = 0;\n    for (int x : arr) {\n        sum += x;\n    }\n    return sum;\n}",
+        },
+        seed=1,
+    ),
+    "two_sum": Problem(
+        id="two_sum",
+        title="Two Sum",
+        description=(
+            "Write a function `two_sum` that takes an array of integers `nums` and an integer `target` "
+            "and returns the indices of two different elements that add up to `target` (exactly one pair exists)."
+        ),
+        params=["int[]", "int"],
+        returns="int[]",
+        names={"Python": "two_sum", "Java": "twoSum", "C++": "twoSum"},
+        starter={
+            "Python": "def two_sum(nums, target):\n    # Write your code here\n    pass",
+            "Java": "public static int[] twoSum(int[] nums, int target) {\n    // Write your code here\n    return new int[0];\n}",
+            "C++": "vector<int> twoSum(vector<int>& nums, int target) {\n    // Write your code here\n    return {};\n}",
+        },
+        edge_cases=[
+            (([2, 7, 11, 15], 9), [0, 1]),
+            (([3, 2, 4], 6), [1, 2]),
+            (([3, 3], 6), [0, 1]),
+            (([-1, -2, -3, -4, -5], -8), [2, 4]),
+            (([0, 4, 3, 0], 0), [0, 3]),
+        ],
+        reference=_two_sum_reference,
+        generate=_two_sum_generate,
+        check=_two_sum_check,
+        profile_generate=_two_sum_worst_case,
+        large_sizes=[1000, 20000],
+        hints=[
+            "Check that you never use the same element twice, and that negative numbers and zero work.",
+            "For each number, the partner you need is `target - x`. A hash map from value to index lets you find it in O(1).",
+        ],
+        solutions={
+            "Python": (
+                "def two_sum(nums, target):\n    seen = {}\n    for i, x in enumerate(nums):\n"
+                "        if target - x in seen:\n            return [seen[target - x], i]\n        seen[x] = i"
+            ),
+            "Java": (
+                "public static int[] twoSum(int[] nums, int target) {\n    Map<Integer, Integer> seen = new HashMap<>();\n"
+                "    for (int i = 0; i < nums.length; i++) {\n        Integer j = seen.get(target - nums[i]);\n"
+                "        if (j != null) {\n            return new int[] {j, i};\n        }\n        seen.put(nums[i], i);\n"
+                "    }\n    return new int[0];\n}"
+            ),
+            "C++": (
+                "vector<int> twoSum(vector<int>& nums, int target) {\n    unordered_map<int, int> seen;\n"
+                "    for (int i = 0; i < (int)nums.size(); i++) {\n        auto it = seen.find(target - nums[i]);\n"
+                "        if (it != seen.end()) {\n            return {it->second, i};\n        }\n        seen[nums[i]] = i;\n"
+                "    }\n    return {};\n}"
+            ),
+        },
+        seed=2,
+    ),
+    "contains_duplicate": Problem(
+        id="contains_duplicate",
+        title="Contains Duplicate",
+        description=(
+            "Write a function `contains_duplicate` that takes an array of integers and returns `True` "
+            "if any value appears at least twice, otherwise `False`."
+        ),
+        params=["int[]"],
+        returns="bool",
+        names={"Python": "contains_duplicate", "Java": "containsDuplicate", "C++": "containsDuplicate"},
+        starter={
+            "Python": "def contains_duplicate(nums):\n    # Write your code here\n    pass",
+            "Java": "public static boolean containsDuplicate(int[] nums) {\n    // Write your code here\n    return false;\n}",
+            "C++": "bool containsDuplicate(vector<int>& nums) {\n    // Write your code here\n    return false;\n}",
+        },
+        edge_cases=[
+            (([],), False),
+            (([1],), False),
+            (([1, 2, 3, 1],), True),
+            (([1, 2, 3, 4],), False),
+            (([-1, -1],), True),
+        ],
+        reference=_contains_duplicate_reference,
+        generate=_contains_duplicate_generate,
+        profile_generate=_contains_duplicate_worst_case,
+        large_sizes=[1000, 100000],
+        hints=[
+            "Think about the empty array and single-element arrays.",
+            "Keep a set of the values you've already seen and stop as soon as you see one again.",
+        ],
+        solutions={
+            "Python": "def contains_duplicate(nums):\n    return len(set(nums)) != len(nums)",
+            "Java": (
+                "public static boolean containsDuplicate(int[] nums) {\n    Set<Integer> seen = new HashSet<>();\n"
+                "    for (int x : nums) {\n        if (!seen.add(x)) {\n            return true;\n        }\n    }\n    return false;\n}"
+            ),
+            "C++": (
+                "bool containsDuplicate(vector<int>& nums) {\n    unordered_set<int> seen;\n"
+                "    for (int x : nums) {\n        if (!seen.insert(x).second) {\n            return true;\n        }\n    }\n    return false;\n}"
+            ),
+        },
+        seed=3,
+    ),
+}
+
+# Order of coding rounds for technical roles
+PROBLEM_ORDER = ["sum_array", "two_sum", "contains_duplicate"]
+
+
+def get_problem(problem_id):
+    return PROBLEMS[problem_id]
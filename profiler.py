@@ -0,0 +1,177 @@
+"""
+Empirical time-complexity profiling of submitted solutions.
+
+After a correct submission the candidate's function is run on geometrically growing inputs
+(in the sandbox for Python, through the compiled runner for Java/C++). The timings are fitted
+against O(1), O(log n), O(n), O(n log n) and O(n^2) models with NumPy least squares, so the
+interviewer can compare the candidate's complexity claim with measured behaviour. Timings are
+noisy and the measured range is short, so the result is an approximation: when two models fit
+about equally well the verdict is withheld and both are reported instead.
+"""
+
+import numpy as np
+
+COMPLEXITY_MODELS = {
+    "O(1)": lambda n: np.ones_like(n),
+    "O(log n)": lambda n: np.log2(n),
+    "O(n)": lambda n: n,
+    "O(n log n)": lambda n: n * np.log2(n),
+    "O(n^2)": lambda n: n ** 2,
+}
+
+# A more complex model must beat a simpler one by this factor to be preferred
+SIMPLICITY_MARGIN = 2.0
+# Over the measured sizes the log factor adds only ~0.14 to the log-log slope of O(n log n), so
+# noise easily makes linear timings fit it better: it must beat O(n) by a wider margin, and the
+# timings must grow clearly faster than linear
+NLOGN_MARGIN = 4.0
+NLOGN_SLOPE = 1.2
+# Confidence drops to 0 as the nearest rival's residual comes within this factor of the winner's
+CLOSE_FIT_RATIO = 1.5
+# Verdicts below this confidence are withheld
+MIN_CONFIDENCE = 0.5
+# Timings that grow less than this over the whole measured range are treated as O(1)
+FLAT_GROWTH = 1.3
+MIN_POINTS = 4
+
+
+def geometric_sizes(start=64, factor=2, max_n=2 ** 17):
+    n = start
+    while n <= max_n:
+        yield n
+        n *= factor
+
+
+def fit_model(n, t, name):
+    """
+    Fit t ~ a*f(n) + b with relative (1/t) weights so small and large sizes count equally.
+    Returns (residual, a, b); a model that needs a negative slope is rejected (infinite residual).
+    """
+    f = COMPLEXITY_MODELS[name](n)
+    w = 1.0 / t
+    if name == "O(1)":
+        b = np.sum(t * w * w) / np.sum(w * w)
+        return float(np.sum(((b - t) * w) ** 2)), 0.0, float(b)
+    A = np.column_stack([f, np.ones_like(f)]) * w[:, None]
+    (a, b), *_ = np.linalg.lstsq(A, t * w, rcond=None)
+    if a < 0:
+        return float("inf"), float(a), float(b)
+    return float(np.sum(((a * f + b - t) * w) ** 2)), float(a), float(b)
+
+
+def fit_complexity(sizes, times):
+    """
+    Pick the complexity class that best explains the timings.
+    The simplest model within SIMPLICITY_MARGIN of the best residual wins (O(n log n) also needs
+    NLOGN_MARGIN over O(n) and a log-log slope of at least NLOGN_SLOPE). Confidence is how well
+    it fits (R^2), scaled down sharply when the nearest rival fits almost as well; for flat
+    timings it reflects how little they vary. Below MIN_CONFIDENCE complexity is None, and
+    candidates holds the winner and its nearest rival.
+    """
+    n = np.asarray(sizes, dtype=np.float64)
+    t = np.maximum(np.asarray(times, dtype=np.float64), 1e-9)
+    fits = {name: fit_model(n, t, name) for name in COMPLEXITY_MODELS}
+    residuals = {name: fit[0] for name, fit in fits.items()}
+    slope = float(np.polyfit(np.log(n), np.log(t), 1)[0])
+
+    lowest = min(residuals.values())
+    best = next(name for name in COMPLEXITY_MODELS if residuals[name] <= lowest * SIMPLICITY_MARGIN + 1e-12)
+    if best == "O(n log n)" and (residuals["O(n)"] <= residuals[best] * NLOGN_MARGIN or slope < NLOGN_SLOPE):
+        best = "O(n)"
+
+    if best != "O(1)":
+        # Small fitted slopes can chase noise; if the fit barely grows across the range, it's flat
+        _, a, b = fits[best]
+        f = COMPLEXITY_MODELS[best](n[[0, -1]])
+        start, end = a * f + b
+        if start > 0 and end / start < FLAT_GROWTH:
+            best = "O(1)"
+
+    rival = min((name for name in COMPLEXITY_MODELS if name != best), key=lambda name: residuals[name])
+    if best == "O(1)":
+        # Confidence for flat timings is how little they vary
+        confidence = float(np.clip(1.0 - np.std(t) / np.mean(t), 0.0, 1.0))
+    else:
+        # 0 when the rival fits as well (or better: the winner only won on simplicity), 1 from
+        # CLOSE_FIT_RATIO times worse
+        ratio = residuals[rival] / residuals[best] if residuals[best] > 1e-12 else float("inf")
+        separation = float(np.clip((ratio - 1.0) / (CLOSE_FIT_RATIO - 1.0), 0.0, 1.0))
+        # R^2 against the flat (O(1)) model
+        baseline = residuals["O(1)"]
+        r_squared = 1.0 - residuals[best] / baseline if baseline > 1e-12 else 1.0
+        confidence = float(np.clip(max(r_squared, 0.0) * separation, 0.0, 1.0))
+    return {
+        "complexity": best if confidence >= MIN_CONFIDENCE else None,
+        "candidates": [best, rival],
+        "confidence": confidence,
+        "slope": slope,
+        "residuals": residuals,
+    }
+
+
+def _inputs(problem, sizes, seed):
+    rng = np.random.default_rng(seed)
+    for n in sizes:
+        yield n, problem.profile_input(rng, n)
+
+
+def profile_python(pool, code, problem, repeats=5, budget=0.25, max_n=2 ** 17, seed=0):
+    """Profile a Python submission in the sandbox pool; returns summarize() output or None"""
+    result = pool.profile(
+        code, problem.names["Python"], _inputs(problem, geometric_sizes(max_n=max_n), seed),
+        repeats=repeats, budget=budget,
+    )
+    return summarize(result["measurements"])
+
+
+def profile_compiled(runner, code, problem, repeats=5, max_n=2 ** 17, seed=0):
+    """
+    Profile a Java/C++ submission: every size is repeated in a single harness run, which
+    times each call itself. Sizes that don't finish within the runner's timeout are dropped.
+    """
+    sizes = list(geometric_sizes(max_n=max_n))
+    tests = []
+    for n, args in _inputs(problem, sizes, seed):
+        tests += [(args, None)] * repeats
+    result = runner.run(code, problem.signature, tests, check=lambda args, exp, out: True)
+
+    measurements = []
+    for i, n in enumerate(sizes):
+        times = sorted(r["seconds"] for r in result["runs"][i * repeats:(i + 1) * repeats] if r["seconds"] is not None)
+        if len(times) < repeats:
+            break
+        measurements.append({"n": n, "seconds": times[len(times) // 2], "min_seconds": times[0], "peak_bytes": None})
+    return summarize(measurements)
+
+
+def summarize(measurements):
+    """Fit the measurements; None if there are too few sizes to say anything"""
+    if len(measurements) < MIN_POINTS:
+        return None
+    fit = fit_complexity([m["n"] for m in measurements], [m["seconds"] for m in measurements])
+    peaks = [m["peak_bytes"] for m in measurements if m["peak_bytes"] is not None]
+    return {
+        "complexity": fit["complexity"],
+        "candidates": fit["candidates"],
+        "confidence": fit["confidence"],
+        "peak_bytes": max(peaks) if peaks else None,
+        "max_n": measurements[-1]["n"],
+        "measurements": measurements,
+    }
+
+
+def describe(profile):
+    """One-line summary for the chat and the interviewer's prompt"""
+    if profile["complexity"] is None:
+        text = (
+            f"Timing runs up to n = {profile['max_n']:,} were inconclusive: roughly "
+            f"{profile['candidates'][0]} or {profile['candidates'][1]}"
+        )
+    else:
+        text = (
+            f"Approximate time complexity from timing runs: {profile['complexity']} "
+            f"(confidence {profile['confidence']:.0%}, up to n = {profile['max_n']:,})"
+        )
+    if profile["peak_bytes"] is not None:
+        text += f", peak extra memory {profile['peak_bytes'] / 1024:.0f} KB"
+    return text
@@ -0,0 +1,295 @@
+"""
+Curated interview question bank with local similarity-based selection.
+
+Behavioral and scenario questions used to be invented by the model on every turn. For the
+roles in the app most of them are predictable, so they now come from a curated bank indexed
+by kind, role, level and skill tags; the model only phrases the chosen question and adapts it
+to the conversation. (Coding problems come from the problems registry.)
+
+Each question is a hashed TF-IDF vector (text plus tags), so JD profiles and questions share
+one fixed-size space without a shared vocabulary. The vectors are written once per bank
+version to a cache directory and memory-mapped, so every server process shares one copy in
+the page cache. Candidate rows per (kind, role, level) are precomputed at load; selecting a
+question is one small matrix-vector product:
+
+    score = similarity to the JD profile / role - NOVELTY * max(0, max similarity to questions already asked)
+
+Since the penalty is never negative, it is only computed for the questions whose similarity
+already beats the best match's penalized score (at most SHORTLIST of them), so asking more
+questions adds almost nothing to the one matrix-vector product per selection.
+"""
+
+import hashlib
+import json
+import math
+import os
+import re
+import zlib
+from dataclasses import dataclass, field
+from typing import List, Tuple
+
+import numpy as np
+
+DIM = 128
+NOVELTY = 0.8     # weight of the penalty for resembling questions already asked
+SHORTLIST = 64    # most candidates the novelty penalty is computed for
+TAG_WEIGHT = 2.0  # tags count this many times as much as words of the question text
+
+ROLES = ["Software Engineer", "Data Scientist", "Sales Associate", "Retail Associate"]
+LEVELS = ["Intern / Fresher", "Junior", "Mid-level", "Senior"]
+KINDS = ["behavioral", "scenario"]
+
+TOKEN = re.compile(r"[a-z][a-z0-9+#]*")
+STOPWORDS = frozenset("""
+a an and are as at be been but by can could did do does for from had has have how i if in
+into is it its me of on or our so that the their them then there they this to tell time
+us was we were what when where which who why will with would you your about describe
+""".split())
+
+SE, DS, SALES, RETAIL = ROLES
+TECH = (SE, DS)
+CUSTOMER = (SALES, RETAIL)
+JUNIOR = ("Intern / Fresher", "Junior")
+EXPERIENCED = ("Mid-level", "Senior")
+
+
+@dataclass
+class Question:
+    id: str
+    kind: str                       # "behavioral" or "scenario"
+    text: str
+    roles: Tuple[str, ...] = tuple(ROLES)
+    levels: Tuple[str, ...] = tuple(LEVELS)
+    tags: List[str] = field(default_factory=list)
+
+
+def _q(id, kind, text, roles=tuple(ROLES), levels=tuple(LEVELS), tags=()):
+    return Question(id, kind, text, tuple(roles), tuple(levels), list(tags))
+
+
+QUESTIONS = [
+    # ---- Behavioral: any role ----
+    _q("b-conflict", "behavioral", "Tell me about a time you disagreed with a teammate. How did you resolve it?", tags=["teamwork", "conflict", "communication"]),
+    _q("b-failure", "behavioral", "Describe a project or task that did not go as planned. What did you learn from it?", tags=["learning", "resilience"]),
+    _q("b-feedback", "behavioral", "Tell me about a time you received critical feedback. What did you do with it?", tags=["feedback", "growth"]),
+    _q("b-priorities", "behavioral", "Describe a time you had several urgent tasks at once. How did you decide what to do first?", tags=["prioritization", "time management"]),
+    _q("b-proud", "behavioral", "What accomplishment are you most proud of, and what was your part in it?", tags=["ownership", "impact"]),
+    _q("b-learn-fast", "behavioral", "Tell me about a time you had to learn something new quickly to get a job done.", tags=["learning", "adaptability"]),
+    _q("b-initiative", "behavioral", "Give an example of something you improved without being asked to.", tags=["initiative", "ownership"]),
+    _q("b-first-project", "behavioral", "Walk me through a school, internship or personal project you enjoyed. What was your role?", levels=JUNIOR, tags=["projects", "motivation"]),
+    _q("b-mentor", "behavioral", "Tell me about a time you mentored or helped a less experienced colleague grow.", levels=EXPERIENCED, tags=["mentoring", "leadership"]),
+    _q("b-influence", "behavioral", "Describe a time you convinced others to change direction without having authority over them.", levels=EXPERIENCED, tags=["influence", "leadership", "stakeholder management"]),
+
+    # ---- Behavioral: technical roles ----
+    _q("b-hard-bug", "behavioral", "Tell me about the hardest bug you have tracked down. How did you find the cause?", TECH, tags=["debugging", "problem solving"]),
+    _q("b-tech-choice", "behavioral", "Describe a technical decision you made where there were real trade-offs. What did you choose and why?", TECH, tags=["system design", "trade-offs"]),
+    _q("b-performance", "behavioral", "Tell me about a time you made something significantly faster or cheaper to run.", TECH, tags=["performance", "optimization", "sql", "python"]),
+    _q("b-code-review", "behavioral", "How do you approach code review, both giving and receiving it? Give an example.", (SE,), tags=["code review", "git", "testing", "collaboration"]),
+    _q("b-legacy", "behavioral", "Tell me about working with a large or legacy codebase. How did you get productive in it?", (SE,), EXPERIENCED, tags=["legacy", "refactoring", "java", "c++"]),
+    _q("b-incident", "behavioral", "Describe a production incident you were involved in. What happened and what changed afterwards?", (SE,), EXPERIENCED, tags=["incident", "reliability", "aws", "kubernetes", "docker", "monitoring"]),
+    _q("b-api-design", "behavioral", "Tell me about an API or service you designed. How did you decide on its interface?", (SE,), EXPERIENCED, tags=["api", "rest", "graphql", "microservices", "distributed systems"]),
+    _q("b-testing", "behavioral", "How do you decide what to test in a feature you build? Tell me about a test that caught a real problem.", (SE,), tags=["testing", "quality", "ci/cd"]),
+    _q("b-frontend", "behavioral", "Tell me about a user-facing feature you built. How did you make sure it worked well for users?", (SE,), tags=["react", "javascript", "typescript", "frontend", "html", "css"]),
+    _q("b-data-pipeline", "behavioral", "Describe a data pipeline you built or maintained. How did you keep the data trustworthy?", TECH, tags=["etl", "spark", "kafka", "airflow", "data quality", "sql"]),
+    _q("b-model-project", "behavioral", "Walk me through a machine learning project from problem definition to result.", (DS,), tags=["machine learning", "scikit-learn", "pytorch", "tensorflow", "modeling"]),
+    _q("b-messy-data", "behavioral", "Tell me about a time the data you had was messy or incomplete. What did you do?", (DS,), tags=["data cleaning", "pandas", "sql", "data quality"]),
+    _q("b-explain-results", "behavioral", "Describe a time you explained an analysis to a non-technical audience. How did you make it land?", (DS,), tags=["communication", "data visualization", "tableau", "power bi", "stakeholder management"]),
+    _q("b-experiment", "behavioral", "Tell me about an experiment or A/B test you designed or analyzed. What did you conclude?", (DS,), tags=["a/b testing", "statistics", "experimentation"]),
+    _q("b-model-failure", "behavioral", "Tell me about a model that performed worse in production than in development. Why?", (DS,), EXPERIENCED, tags=["machine learning", "monitoring", "deployment", "drift"]),
+
+    # ---- Behavioral: customer-facing roles ----
+    _q("b-difficult-customer", "behavioral", "Tell me about a difficult customer you dealt with. How did the conversation go?", CUSTOMER, tags=["customer service", "communication", "conflict"]),
+    _q("b-target", "behavioral", "Describe a time you had to hit a target or quota. How did you plan to get there?", (SALES,), tags=["quota", "sales", "planning"]),
+    _q("b-lost-deal", "behavioral", "Tell me about a deal you lost. What would you do differently?", (SALES,), tags=["sales", "negotiation", "learning"]),
+    _q("b-prospecting", "behavioral", "How do you find and qualify new prospects? Walk me through a recent example.", (SALES,), tags=["lead generation", "cold calling", "crm", "salesforce"]),
+    _q("b-account", "behavioral", "Tell me about a customer relationship you grew over time. What did you do to earn their trust?", (SALES,), EXPERIENCED, tags=["account management", "relationships"]),
+    _q("b-busy-shift", "behavioral", "Describe your busiest shift. How did you keep customers happy while staying on top of tasks?", (RETAIL,), tags=["customer service", "time management", "teamwork"]),
+    _q("b-store-standards", "behavioral", "Tell me about a time you noticed a problem in the store, such as stock or displays, and fixed it.", (RETAIL,), tags=["inventory", "merchandising", "initiative"]),
+    _q("b-upsell", "behavioral", "Tell me about a time you helped a customer find something better suited than what they came in for.", CUSTOMER, tags=["sales", "customer service", "product knowledge"]),
+    _q("b-cash", "behavioral", "Have you handled cash or a point-of-sale system? Tell me about a time something didn't add up.", (RETAIL,), tags=["pos", "accuracy", "integrity"]),
+
+    # ---- Scenarios: any role ----
+    _q("s-deadline", "scenario", "Imagine a deadline suddenly moves up by a week. What do you do first?", tags=["prioritization", "communication", "time management"]),
+    _q("s-teammate", "scenario", "A teammate keeps missing their part of shared work and it is affecting yours. How do you handle it?", tags=["teamwork", "conflict", "communication"]),
+    _q("s-mistake", "scenario", "You realize you made a mistake that your manager hasn't noticed yet. What do you do?", tags=["integrity", "ownership"]),
+    _q("s-unclear", "scenario", "You are given a task with very unclear requirements and your manager is away. How do you proceed?", tags=["ambiguity", "initiative"]),
+    _q("s-new-team", "scenario", "It's your first week on a new team. How do you get up to speed?", levels=JUNIOR, tags=["onboarding", "learning"]),
+    _q("s-disagree-lead", "scenario", "Your team lead wants to go with an approach you believe is wrong. What do you do?", levels=EXPERIENCED, tags=["influence", "conflict", "leadership"]),
+
+    # ---- Scenarios: technical roles ----
+    _q("s-outage", "scenario", "The service you own goes down during peak traffic. Walk me through your first 30 minutes.", (SE,), tags=["incident", "reliability", "monitoring", "aws", "kubernetes"]),
+    _q("s-slow-endpoint", "scenario", "Users report that one page has become very slow. How do you investigate?", (SE,), tags=["performance", "debugging", "sql", "redis", "caching"]),
+    _q("s-scale", "scenario", "Traffic to your service is expected to grow ten times next month. How do you prepare?", (SE,), EXPERIENCED, tags=["system design", "distributed systems", "scalability", "kafka", "microservices"]),
+    _q("s-tech-debt", "scenario", "Your team wants to pay down technical debt but the product manager wants new features. How do you decide?", (SE,), tags=["tech debt", "prioritization", "stakeholder management"]),
+    _q("s-security", "scenario", "You notice secrets committed to a shared repository. What do you do?", (SE,), tags=["security", "git", "ci/cd"]),
+    _q("s-metric-drop", "scenario", "A key business metric dropped 15% overnight. How do you find out why?", (DS,), tags=["analytics", "sql", "statistics", "debugging"]),
+    _q("s-biased-model", "scenario", "You discover your model performs much worse for one group of users. What do you do?", (DS,), tags=["fairness", "machine learning", "evaluation"]),
+    _q("s-stakeholder-answer", "scenario", "A stakeholder wants the analysis to support a conclusion the data doesn't back. How do you respond?", (DS,), tags=["integrity", "communication", "stakeholder management"]),
+    _q("s-small-data", "scenario", "You are asked to build a prediction model but only have a few hundred labeled examples. How do you approach it?", (DS,), tags=["machine learning", "statistics", "modeling"]),
+
+    # ---- Scenarios: customer-facing roles ----
+    _q("s-angry-customer", "scenario", "A customer is angry about a problem that wasn't your fault and starts raising their voice. What do you do?", CUSTOMER, tags=["customer service", "de-escalation", "communication"]),
+    _q("s-price-objection", "scenario", "A prospect says your product is too expensive compared to a competitor. How do you respond?", (SALES,), tags=["negotiation", "objection handling", "sales"]),
+    _q("s-pipeline-dry", "scenario", "It's mid-quarter and your pipeline is much thinner than you need. What's your plan?", (SALES,), tags=["lead generation", "planning", "crm"]),
+    _q("s-overpromise", "scenario", "A colleague promised a customer something the product can't do. The customer calls you. What do you say?", (SALES,), tags=["integrity", "account management", "communication"]),
+    _q("s-long-line", "scenario", "The store is packed, the checkout line is long and a customer needs help finding an item. What do you do?", (RETAIL,), tags=["customer service", "prioritization", "teamwork"]),
+    _q("s-shoplifting", "scenario", "You suspect a customer is shoplifting. How do you handle it?", (RETAIL,), tags=["loss prevention", "policy", "safety"]),
+    _q("s-out-of-stock", "scenario", "A customer wants an item that is out of stock and they need it today. What do you do?", (RETAIL,), tags=["inventory", "customer service", "problem solving"]),
+    _q("s-return-policy", "scenario", "A customer wants to return an item outside the return policy. How do you handle it?", (RETAIL,), tags=["policy", "customer service", "judgment"]),
+]
+
+
+def tokenize(text):
+    return [t for t in TOKEN.findall(text.lower()) if t not in STOPWORDS and len(t) > 1]
+
+
+def _bucket(term):
+    """Stable hash bucket and sign of a term (signed hashing halves the cost of collisions)"""
+    h = zlib.crc32(term.encode("utf-8"))
+    return h % DIM, 1.0 if (h >> 31) & 1 else -1.0
+
+
+def hash_counts(text, tags=()):
+    """Hashed term frequencies (float32[DIM]) of text plus weighted tags"""
+    counts = np.zeros(DIM, dtype=np.float32)
+    for term in tokenize(text):
+        i, sign = _bucket(term)
+        counts[i] += sign
+    for tag in tags:
+        for term in tokenize(tag):
+            i, sign = _bucket(term)
+            counts[i] += sign * TAG_WEIGHT
+    return counts
+
+
+def _normalize(vectors):
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-9)
+
+
+def bank_version(questions):
+    payload = json.dumps([[q.id, q.kind, q.text, q.roles, q.levels, q.tags] for q in questions] + [DIM, TAG_WEIGHT])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def build_bank(questions, directory):
+    """
+    Write the bank to directory: one contiguous block of rows per (kind, role), so each
+    selection scores a slice of the memory map, with each row's question (in ascending order
+    within a block) and level mask.
+    """
+    counts = np.stack([hash_counts(q.text, q.tags) for q in questions])
+    df = np.count_nonzero(counts, axis=0).astype(np.float32)
+    idf = np.log((1.0 + len(questions)) / (1.0 + df)) + 1.0
+    tf = np.sign(counts) * np.log1p(np.abs(counts))
+    vectors = _normalize(tf * idf).astype(np.float32)
+
+    layout, blocks = [], {}
+    for kind in KINDS:
+        for role in ROLES:
+            start = len(layout)
+            layout.extend(i for i, q in enumerate(questions) if q.kind == kind and role in q.roles)
+            blocks[f"{kind}|{role}"] = [start, len(layout)]
+    layout = np.array(layout, dtype=np.int32)
+    levels = np.array([sum(1 << LEVELS.index(lv) for lv in q.levels) for q in questions], dtype=np.uint8)
+
+    os.makedirs(directory, exist_ok=True)
+    tmp = f"{directory}.{os.getpid()}.tmp"
+    os.makedirs(tmp, exist_ok=True)
+    np.save(os.path.join(tmp, "vectors.npy"), vectors[layout])
+    np.save(os.path.join(tmp, "ids.npy"), layout)
+    np.save(os.path.join(tmp, "levels.npy"), levels[layout])
+    np.save(os.path.join(tmp, "idf.npy"), idf.astype(np.float32))
+    with open(os.path.join(tmp, "questions.json"), "w") as f:
+        json.dump({
+            "questions": [{"id": q.id, "text": q.text, "kind": q.kind} for q in questions],
+            "blocks": blocks,
+        }, f)
+    for name in ("vectors.npy", "ids.npy", "levels.npy", "idf.npy", "questions.json"):
+        os.replace(os.path.join(tmp, name), os.path.join(directory, name))
+    os.rmdir(tmp)
+
+
+class QuestionBank:
+    """
+    Memory-mapped question bank in cache_dir (built on first use for this bank version).
+    - novelty: weight of the penalty for resembling questions already asked
+    - shortlist: most candidates the novelty penalty is computed for
+    """
+
+    def __init__(self, cache_dir, questions=QUESTIONS, novelty=NOVELTY, shortlist=SHORTLIST):
+        self.novelty = novelty
+        self.shortlist = shortlist
+        directory = os.path.join(cache_dir, bank_version(questions))
+        if not os.path.exists(os.path.join(directory, "questions.json")):
+            build_bank(questions, directory)
+
+        def load(name):
+            # Plain ndarray views of the memory map (memmap's own indexing is slower)
+            return np.asarray(np.load(os.path.join(directory, name), mmap_mode="r"))
+
+        self.vectors = load("vectors.npy")
+        self.ids = load("ids.npy")
+        self.levels = load("levels.npy")
+        self.idf = np.load(os.path.join(directory, "idf.npy"))
+        with open(os.path.join(directory, "questions.json")) as f:
+            bank = json.load(f)
+        self.questions = bank["questions"]
+        self.blocks = {tuple(key.split("|")): tuple(span) for key, span in bank["blocks"].items()}
+        self.index = {q["id"]: i for i, q in enumerate(self.questions)}
+        # A row holding each question's vector (for the novelty penalty)
+        self.first_row = np.zeros(len(self.questions), dtype=np.int64)
+        self.first_row[self.ids[::-1]] = np.arange(len(self.ids))[::-1]
+
+    def __len__(self):
+        return len(self.questions)
+
+    def query_vector(self, text, tags=()):
+        counts = hash_counts(text, tags)
+        tf = np.sign(counts) * np.log1p(np.abs(counts))
+        return _normalize(tf * self.idf).astype(np.float32)
+
+    def select(self, kind, role, level, query, asked=()):
+        """
+        The best question of kind for role and level that hasn't been asked (dict with id,
+        text, kind and score), or None when all have been.
+        - query: query_vector of what the question should be about (JD profile, role, last answer)
+        - asked: ids of the questions already asked in this interview
+        """
+        start, end = self.blocks.get((kind, role), (0, 0))
+        if start == end:
+            return None
+        scores = self.vectors[start:end] @ query
+        scores[(self.levels[start:end] & (1 << LEVELS.index(level))) == 0] = -np.inf
+        asked_ids = np.array([self.index[a] for a in asked if a in self.index], dtype=self.ids.dtype)
+        if len(asked_ids):
+            # A block's ids are ascending, so the asked questions' rows are found by binary search
+            ids = self.ids[start:end]
+            at = np.minimum(np.searchsorted(ids, asked_ids), len(ids) - 1)
+            scores[at[ids[at] == asked_ids]] = -np.inf
+        best = int(np.argmax(scores))
+        if not math.isfinite(scores[best]):
+            return None
+        score = float(scores[best])
+        if len(asked_ids):
+            asked_vectors = self.vectors[self.first_row[asked_ids]]
+            score -= self.novelty * max(float((asked_vectors @ self.vectors[start + best]).max()), 0.0)
+            # Only questions that already score higher than that can still beat it
+            rivals = np.flatnonzero(scores > score)
+            if len(rivals) > self.shortlist:
+                rivals = rivals[np.argpartition(-scores[rivals], self.shortlist)[:self.shortlist]]
+            if len(rivals):
+                similarity = (self.vectors[start + rivals] @ asked_vectors.T).max(axis=1)
+                penalized = scores[rivals] - self.novelty * np.maximum(similarity, 0.0)
+                i = int(np.argmax(penalized))
+                if penalized[i] > score:
+                    best, score = int(rivals[i]), float(penalized[i])
+        return dict(self.questions[self.ids[start + best]], score=score)
+
+
+def question_prompt(question):
+    """Instruction for the model to put a selected question to the candidate"""
+    return (
+        f"Next question (from the question bank): \"{question['text']}\" Briefly acknowledge the last answer, "
+        "then ask this question in your own words, adapted to the role and the conversation."
+    )
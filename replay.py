@@ -0,0 +1,365 @@
+"""
+Headless batch replay and grading of recorded interviews.
+
+When the prompts or models change, a cohort's saved interviews can be regraded (or re-run)
+without the Streamlit app. Each transcript goes through the same steps as a live session -
+role context with the job description digest, the interviewer prompt of each phase, Python
+code checks in the sandbox and the map-reduce feedback - with several transcripts in flight at
+once under the same per-process rate limits the app uses:
+
+    python replay.py cohort.jsonl --out results.jsonl --workers 8
+    python replay.py cohort.jsonl --out replayed.jsonl --mode replay --stub --latency-ms 50
+
+Input is JSONL, one interview per line:
+
+    {"id": "...", "role": "Software Engineer", "level": "Junior", "company": "", "jd": "",
+     "messages": [{"role": "assistant" | "user", "content": "..."}],
+     "submissions": [{"problem": "sum_array", "language": "Python", "code": "..."}]}
+
+- grade: review the saved transcript as it is
+- replay: first regenerate every interviewer reply that answers a candidate message, with the
+  current prompts, then review the new transcript. Messages the UI produced without a model
+  call (the opener, test results) and the replies that follow them are kept as recorded.
+
+Results are appended to the output file as each interview finishes, one JSON line each; the
+output doubles as the checkpoint, so rerunning the same command after an interruption skips the
+interviews already done. A summary (transcripts per minute, p50/p95 seconds per interview,
+code pass rate, per-task model stats) is printed at the end. With --stub the model is the local
+fake API (fake_groq.py), whose replies are fixed, for deterministic regression runs.
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from conversation import ConversationContext, summary_messages
+from feedback import CODING_RESULT_PREFIXES, LANGUAGE_CHOICES, merge_messages, review_messages, review_phases, split_phases
+from interview import (
+    TECHNICAL_ROLES, InterviewFlow, get_role_context, problem_prompt, select_bank_question, system_prompt,
+)
+from jobdesc import JDCache
+from llm import LLMClient, LLMError
+from problems import PROBLEM_ORDER, PROBLEMS
+from questions import QuestionBank, question_prompt
+from router import ModelRouter, interview_tasks
+from sandbox import SandboxPool
+from scheduler import RateScheduler
+
+# Test result messages that end a coding round (solved, or out of attempts)
+ROUND_OVER = ("✅ **Excellent work!**", "💡 **Solution:**")
+
+
+def read_transcripts(path):
+    """Interviews of a JSONL file; lines without an id are named after their line number"""
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            if line.strip():
+                record = json.loads(line)
+                record.setdefault("id", f"line-{number}")
+                yield record
+
+
+def completed_ids(path):
+    """Ids already graded in an earlier run's output (a torn last line is ignored)"""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except ValueError:
+                continue
+            if result.get("status") == "ok":
+                done.add(result["id"])
+    return done
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+class ReplayEngine:
+    """
+    Grades (and optionally re-runs) recorded interviews.
+    - router: ModelRouter over interview_tasks(...)
+    - sandbox: SandboxPool for Python submissions; None skips the code checks
+    - bank: QuestionBank for the behavioral and scenario questions of replayed turns
+    - scheduler: the client's RateScheduler; each interview is its own session in the queue
+    """
+
+    def __init__(self, router, sandbox=None, bank=None, scheduler=None, mode="grade", coding_rounds=2,
+                 jd_top_k=2, context_token_budget=3000, context_keep_turns=4):
+        self.router = router
+        self.sandbox = sandbox
+        self.bank = bank
+        self.scheduler = scheduler
+        self.mode = mode
+        self.coding_rounds = coding_rounds
+        self.jd_top_k = jd_top_k
+        self.context_token_budget = context_token_budget
+        self.context_keep_turns = context_keep_turns
+        self.jd_cache = JDCache()
+
+    def role_context(self, record, query):
+        jd = record.get("jd") or ""
+        digest = self.jd_cache.get(jd).context(query, self.jd_top_k) if jd else ""
+        return get_role_context(record["role"], record.get("level", "Mid-level"), record.get("company", ""), digest)
+
+    # ---- Code checks ----
+    def check(self, submission):
+        """Rerun one submission; only Python ones are checked (the compiled runners need toolchains)"""
+        problem = PROBLEMS[submission["problem"]]
+        language = submission.get("language", "Python")
+        result = {"problem": problem.id, "language": language}
+        if language != "Python" or self.sandbox is None:
+            return dict(result, skipped=True)
+        run = problem.evaluate_python(self.sandbox, submission["code"])
+        return dict(result, error=run["error"], passed=run["passed"], total=run["total"])
+
+    @staticmethod
+    def coding_notes(checks):
+        notes = []
+        for check in checks:
+            if check.get("skipped"):
+                continue
+            title = PROBLEMS[check["problem"]].title
+            if check["error"]:
+                notes.append(f"Submission for {title} failed with: {check['error']}")
+            else:
+                notes.append(f"Submission for {title} passed {check['passed']}/{check['total']} tests.")
+        return "\n".join(notes)
+
+    # ---- Replay ----
+    def bank_question(self, record, phase, flow, answer, asked):
+        """The next bank question for the phase (the caller records it as asked once it's used), or None"""
+        if self.bank is None:
+            return None
+        jd = record.get("jd") or ""
+        question = select_bank_question(
+            self.bank, phase, flow.answers, record["role"], record.get("level", "Mid-level"),
+            self.jd_cache.get(jd).profile_text() if jd else "", answer, asked,
+        )
+        return question
+
+    def replay(self, record):
+        """The transcript with each reply to a candidate message regenerated by the current prompts"""
+        technical = record["role"] in TECHNICAL_ROLES
+        flow = InterviewFlow(coding_rounds=self.coding_rounds)
+        context = ConversationContext(
+            lambda summary, turns: self.router.complete(summary_messages(summary, turns), task="summary").strip(),
+            token_budget=self.context_token_budget, keep_turns=self.context_keep_turns,
+        )
+        messages, asked, problem_index = [], [], 0
+        for i, message in enumerate(record["messages"]):
+            previous = record["messages"][i - 1] if i else None
+            if message["role"] == "user":
+                # Picking a language is a button in the app, not an answer
+                if message["content"] not in LANGUAGE_CHOICES:
+                    flow.on_answer(technical)
+                messages.append(message)
+                continue
+            if previous is None or previous["role"] != "user" or message["content"].startswith(CODING_RESULT_PREFIXES):
+                messages.append(message)
+                if any(marker in message["content"] for marker in ROUND_OVER):
+                    problem_index += 1
+                    flow.on_round_finished()
+                continue
+
+            extra = []
+            if previous["content"] in LANGUAGE_CHOICES:
+                problem = PROBLEMS[PROBLEM_ORDER[min(problem_index, len(PROBLEM_ORDER) - 1)]]
+                extra = [{"role": "system", "content": problem_prompt(problem)}]
+            exchange = " ".join(m["content"] for m in messages[-2:] + extra)
+            system_msgs = [
+                {"role": "system", "content": system_prompt(flow.phase)},
+                {"role": "system", "content": self.role_context(record, exchange)},
+            ]
+            question = self.bank_question(record, flow.phase, flow, previous["content"], asked)
+            if question:
+                system_msgs.append({"role": "system", "content": question_prompt(question)})
+            prompt = context.build(system_msgs, messages) + extra
+            messages.append({"role": "assistant", "content": self.router.complete(prompt, task="chat")})
+            if question:
+                asked.append(question["id"])
+        return messages
+
+    # ---- Grading ----
+    def grade(self, record, messages, checks):
+        """(feedback, phase reviews, phase errors); raises LLMError if no phase could be reviewed"""
+        role_context = self.role_context(record, " ".join(m["content"] for m in messages if m["role"] == "user"))
+        notes = self.coding_notes(checks)
+        prompts = {
+            phase: review_messages(role_context, phase, phase_messages, notes if phase == "coding" else "")
+            for phase, phase_messages in split_phases(messages).items()
+        }
+        reviews, errors, _ = review_phases(self.router, "feedback_review", prompts)
+        if not reviews:
+            error = next(iter(errors.values()), None)
+            raise error if isinstance(error, LLMError) else LLMError("The interview could not be reviewed.")
+        feedback = self.router.complete(merge_messages(role_context, reviews), task="feedback")
+        return feedback, reviews, {phase: str(e) for phase, e in errors.items()}
+
+    def run_one(self, record):
+        """Result dict for one interview; failures are reported in it rather than raised"""
+        start = time.perf_counter()
+        if self.scheduler is not None:
+            self.scheduler.bind_session(record["id"])
+        result = {"id": record["id"], "mode": self.mode}
+        try:
+            messages = self.replay(record) if self.mode == "replay" else record["messages"]
+            checks = [self.check(submission) for submission in record.get("submissions", [])]
+            feedback, reviews, review_errors = self.grade(record, messages, checks)
+        except Exception as e:
+            result.update(status="error", error=f"{type(e).__name__}: {e}")
+        else:
+            result.update(status="ok", feedback=feedback, reviews=reviews, review_errors=review_errors, code=checks)
+            if self.mode == "replay":
+                result["messages"] = messages
+        result["seconds"] = round(time.perf_counter() - start, 3)
+        return result
+
+    def run(self, records, out_path, workers=4, resume=True):
+        """
+        Grade records with up to workers interviews in flight, appending each result to
+        out_path as it completes. With resume, interviews already in out_path are skipped.
+        Returns the run summary.
+        """
+        done = completed_ids(out_path) if resume else set()
+        if not resume and os.path.exists(out_path):
+            os.remove(out_path)
+        elif os.path.exists(out_path) and os.path.getsize(out_path):
+            # An interrupted run may have left a torn last line; start on a fresh one
+            with open(out_path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                torn = f.read(1) != b"\n"
+            if torn:
+                with open(out_path, "a", encoding="utf-8") as f:
+                    f.write("\n")
+
+        lock = threading.Lock()
+        results, skipped = [], 0
+        start = time.perf_counter()
+
+        def finish(futures, out):
+            for future in futures:
+                result = future.result()
+                with lock:
+                    out.write(json.dumps(result, ensure_ascii=False) + "\n")
+                    out.flush()
+                    results.append(result)
+
+        with open(out_path, "a", encoding="utf-8") as out, ThreadPoolExecutor(workers, thread_name_prefix="replay") as pool:
+            pending = set()
+            for record in records:
+                if record["id"] in done:
+                    skipped += 1
+                    continue
+                # Bounded read-ahead: large input files aren't loaded all at once
+                if len(pending) >= 2 * workers:
+                    finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    finish(finished, out)
+                pending.add(pool.submit(self.run_one, record))
+            finish(wait(pending).done, out)
+
+        wall = time.perf_counter() - start
+        ok = [r for r in results if r["status"] == "ok"]
+        checks = [c for r in ok for c in r["code"] if not c.get("skipped")]
+        seconds = [r["seconds"] for r in ok]
+        return {
+            "mode": self.mode,
+            "completed": len(ok),
+            "failed": len(results) - len(ok),
+            "skipped": skipped,
+            "wall_seconds": round(wall, 2),
+            "transcripts_per_minute": round(len(ok) / wall * 60, 2) if wall > 0 else None,
+            "p50_seconds": percentile(seconds, 0.5),
+            "p95_seconds": percentile(seconds, 0.95),
+            "code": {
+                "checked": len(checks),
+                "passed_all": sum(1 for c in checks if not c["error"] and c["passed"] == c["total"]),
+            },
+            "tasks": {name: row for name, row in self.router.stats().items() if row["calls"]},
+            "scheduler": self.scheduler.stats() if self.scheduler is not None else None,
+        }
+
+
+def main(argv=None):
+    import fake_groq
+
+    parser = argparse.ArgumentParser(description="Batch replay and grading of recorded interviews")
+    parser.add_argument("input", help="JSONL of interviews")
+    parser.add_argument("--out", required=True, help="JSONL results; also the checkpoint for resuming")
+    parser.add_argument("--mode", choices=["grade", "replay"], default="grade")
+    parser.add_argument("--workers", type=int, default=4, help="interviews in flight at once")
+    parser.add_argument("--restart", action="store_true", help="discard earlier results instead of resuming")
+    parser.add_argument("--no-code", action="store_true", help="skip the code checks")
+    parser.add_argument("--report", default=None, help="also write the summary JSON here")
+    parser.add_argument("--rpm", type=int, default=None, help="requests per minute (default: LLM_RPM, or no limit with --stub)")
+    parser.add_argument("--tpm", type=int, default=None, help="tokens per minute (default: LLM_TPM, or no limit with --stub)")
+    parser.add_argument("--stub", action="store_true", help="run against the local fake API (fake_groq.py)")
+    fake_groq.add_arguments(parser)
+    parser.set_defaults(seed=0)
+    args = parser.parse_args(argv)
+
+    base_url = os.getenv("GROQ_BASE_URL")
+    api_key = os.getenv("GROQ_API_KEY")
+    server = None
+    if args.stub:
+        server, base_url = fake_groq.serve(fake_groq.config_from_args(args))
+        api_key = "fake"
+    rpm = args.rpm if args.rpm is not None else 0 if args.stub else int(os.getenv("LLM_RPM", "30"))
+    tpm = args.tpm if args.tpm is not None else 0 if args.stub else int(os.getenv("LLM_TPM", "6000"))
+
+    scheduler = RateScheduler({"chat": (rpm, tpm), "audio": (0, 0)})
+    llm = LLMClient(
+        api_key=api_key,
+        base_url=base_url,
+        deadline=float(os.getenv("LLM_DEADLINE", "30")),
+        max_attempts=int(os.getenv("LLM_MAX_ATTEMPTS", "4")),
+        scheduler=scheduler,
+    )
+    tasks = interview_tasks(
+        os.getenv("CHAT_MODEL", "llama-3.1-8b-instant"),
+        os.getenv("FEEDBACK_MODEL", "llama-3.3-70b-versatile"),
+        os.getenv("FAST_MODEL", "llama-3.1-8b-instant"),
+    )
+    sandbox = None
+    if not args.no_code:
+        sandbox = SandboxPool(
+            size=int(os.getenv("SANDBOX_WORKERS", "2")),
+            memory_mb=int(os.getenv("SANDBOX_MEMORY_MB", "256")),
+            wall_timeout=float(os.getenv("SANDBOX_WALL_TIMEOUT", "2.0")),
+            cpu_timeout=float(os.getenv("SANDBOX_CPU_TIMEOUT", "1.0")),
+            user=os.getenv("SANDBOX_USER", ""),
+        )
+    bank = QuestionBank(os.getenv("QUESTION_BANK_DIR", ".question_bank")) if args.mode == "replay" else None
+    engine = ReplayEngine(
+        ModelRouter(llm, tasks), sandbox=sandbox, bank=bank, scheduler=scheduler, mode=args.mode,
+        coding_rounds=int(os.getenv("CODING_ROUNDS", "2")), jd_top_k=int(os.getenv("JD_TOP_K", "2")),
+        context_token_budget=int(os.getenv("CONTEXT_TOKEN_BUDGET", "3000")),
+        context_keep_turns=int(os.getenv("CONTEXT_KEEP_TURNS", "4")),
+    )
+    try:
+        report = engine.run(read_transcripts(args.input), args.out, workers=args.workers, resume=not args.restart)
+    finally:
+        if sandbox is not None:
+            sandbox.close()
+        if server is not None:
+            server.shutdown()
+
+    text = json.dumps(report, indent=2)
+    if args.report:
+        with open(args.report, "w") as f:
+            f.write(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
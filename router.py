@@ -0,0 +1,218 @@
+"""
+Task-based model routing.
+
+Every model call names its task ("chat", "opener", "feedback", ...) instead of a model. The
+router looks up the task's model, temperature, max_tokens and latency target, and records
+per-task latency and token statistics so the routes can be tuned from data.
+
+When a task's recent p95 latency on its primary model is over its target, calls go to the
+task's (faster) fallback model instead; every probe_every-th call still goes to the primary.
+Recovery is judged on those probes alone: once the last recover_samples probes are within
+the target, the route switches back and the primary's window starts afresh, so the slow
+samples from before the fallback don't keep it away. For streamed tasks the latency that
+counts is the time to the first token, since that is what the candidate waits for.
+"""
+
+import threading
+import time
+
+from conversation import estimate_message_tokens, estimate_tokens
+from llm import LatencyTracker
+from scheduler import BACKGROUND, FEEDBACK, LIVE
+
+
+class Task:
+    """
+    Route of one kind of call.
+    - target: latency target in seconds (None: never fall back)
+    - fallback: model used while the primary misses the target
+    - priority: scheduler priority of the task's requests (see scheduler.py)
+    """
+
+    def __init__(self, model, temperature=0.7, max_tokens=None, target=None, fallback=None, priority=0):
+        self.model = model
+        self.priority = priority
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.target = target
+        self.fallback = fallback
+
+
+class TaskStats:
+    def __init__(self, window):
+        self.calls = 0
+        self.fallbacks = 0
+        self.errors = 0
+        self.over_target = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.latency = LatencyTracker(window=window, min_samples=1)
+        self.probes = None    # LatencyTracker of primary probes while on the fallback
+
+
+class ModelRouter:
+    """
+    Routes calls through an LLMClient.
+    - tasks: {name: Task}
+    - min_samples: latencies needed on a model before its p95 can trigger a fallback
+    - recover_samples: probes within the target needed to switch back to the primary
+    """
+
+    def __init__(self, llm, tasks, min_samples=5, probe_every=10, window=100, recover_samples=3):
+        self.llm = llm
+        self.tasks = tasks
+        self.min_samples = min_samples
+        self.probe_every = probe_every
+        self.window = window
+        self.recover_samples = recover_samples
+        self._lock = threading.Lock()
+        self._stats = {name: TaskStats(window) for name in tasks}
+        self._model_latency = {}    # (task, model) -> LatencyTracker
+
+    def _tracker(self, name, model):
+        key = (name, model)
+        with self._lock:
+            tracker = self._model_latency.get(key)
+            if tracker is None:
+                tracker = self._model_latency[key] = LatencyTracker(self.window, self.min_samples)
+            return tracker
+
+    def choose(self, name):
+        """(task, model) for the next call of task name"""
+        task = self.tasks[name]
+        stats = self._stats[name]
+        with self._lock:
+            stats.calls += 1
+            probe = stats.calls % self.probe_every == 0
+            degraded = stats.probes is not None
+        if task.target is None or not task.fallback or task.fallback == task.model:
+            return task, task.model
+        if degraded:
+            if probe:
+                return task, task.model
+            with self._lock:
+                stats.fallbacks += 1
+            return task, task.fallback
+        p95 = self._tracker(name, task.model).percentile(0.95)
+        if p95 is not None and p95 > task.target:
+            with self._lock:
+                stats.fallbacks += 1
+                stats.probes = LatencyTracker(self.recover_samples, self.recover_samples)
+            return task, task.fallback
+        return task, task.model
+
+    def _record(self, name, model, seconds, messages, reply):
+        task = self.tasks[name]
+        stats = self._stats[name]
+        with self._lock:
+            probes = stats.probes if model == task.model else None
+        if probes is not None:
+            probes.record(seconds)
+            p95 = probes.percentile(0.95)
+            if p95 is not None and p95 <= task.target:
+                with self._lock:
+                    stats.probes = None
+                    self._model_latency[(name, model)] = LatencyTracker(self.window, self.min_samples)
+        self._tracker(name, model).record(seconds)
+        stats.latency.record(seconds)
+        with self._lock:
+            if task.target is not None and seconds > task.target:
+                stats.over_target += 1
+            stats.prompt_tokens += estimate_message_tokens(messages)
+            stats.completion_tokens += estimate_tokens(reply)
+
+    def _error(self, name):
+        with self._lock:
+            self._stats[name].errors += 1
+
+    def complete(self, messages, task, **kwargs):
+        """Reply text for the task; kwargs go to LLMClient.complete (e.g. deadline)"""
+        route, model = self.choose(task)
+        start = time.perf_counter()
+        try:
+            reply = self.llm.complete(
+                messages, model=model, temperature=route.temperature, max_tokens=route.max_tokens,
+                priority=route.priority, **kwargs
+            )
+        except Exception:
+            self._error(task)
+            raise
+        self._record(task, model, time.perf_counter() - start, messages, reply)
+        return reply
+
+    def stream(self, messages, task, **kwargs):
+        """Yield reply tokens for the task; the first-token latency is what gets recorded"""
+        route, model = self.choose(task)
+        start = time.perf_counter()
+        ttft = None
+        parts = []
+        try:
+            for delta in self.llm.stream(
+                messages, model=model, temperature=route.temperature, max_tokens=route.max_tokens,
+                priority=route.priority, **kwargs
+            ):
+                if ttft is None:
+                    ttft = time.perf_counter() - start
+                parts.append(delta)
+                yield delta
+        except Exception:
+            self._error(task)
+            raise
+        self._record(task, model, ttft if ttft is not None else time.perf_counter() - start, messages, "".join(parts))
+
+    async def acomplete(self, messages, task, **kwargs):
+        route, model = self.choose(task)
+        start = time.perf_counter()
+        try:
+            reply = await self.llm.acomplete(
+                messages, model=model, temperature=route.temperature, max_tokens=route.max_tokens,
+                priority=route.priority, **kwargs
+            )
+        except Exception:
+            self._error(task)
+            raise
+        self._record(task, model, time.perf_counter() - start, messages, reply)
+        return reply
+
+    async def aclose(self):
+        await self.llm.aclose()
+
+    def stats(self):
+        """Per-task counters, latency percentiles (seconds), p95 per model used and estimated token totals"""
+        result = {}
+        for name, stats in self._stats.items():
+            with self._lock:
+                row = {
+                    "calls": stats.calls,
+                    "fallbacks": stats.fallbacks,
+                    "on_fallback": stats.probes is not None,
+                    "errors": stats.errors,
+                    "over_target": stats.over_target,
+                    "prompt_tokens": stats.prompt_tokens,
+                    "completion_tokens": stats.completion_tokens,
+                }
+            row["p50"] = stats.latency.percentile(0.5)
+            row["p95"] = stats.latency.percentile(0.95)
+            with self._lock:
+                trackers = [(model, t) for (task, model), t in self._model_latency.items() if task == name]
+            row["models"] = {model: tracker.percentile(0.95) for model, tracker in trackers}
+            result[name] = row
+        return result
+
+
+def interview_tasks(chat_model, feedback_model, fast_model):
+    """
+    Route of every kind of model call in the interview. Targets are seconds to the first token
+    for the streamed tasks (chat, feedback) and to the whole reply for the rest. Openers are
+    generated in the background and follow-ups while the submission is evaluated; when one
+    isn't ready, the live reply is a chat call. Follow-ups run at live priority, since the
+    candidate is already waiting for the run's result.
+    """
+    return {
+        "opener": Task(chat_model, temperature=0.9, max_tokens=300, target=5.0, fallback=fast_model, priority=BACKGROUND),
+        "chat": Task(chat_model, temperature=0.7, max_tokens=600, target=1.5, fallback=fast_model, priority=LIVE),
+        "followup": Task(chat_model, temperature=0.7, max_tokens=600, target=4.0, fallback=fast_model, priority=LIVE),
+        "summary": Task(fast_model, temperature=0.2, max_tokens=300, priority=LIVE),
+        "feedback_review": Task(fast_model, temperature=0.3, max_tokens=300, target=6.0, priority=FEEDBACK),
+        "feedback": Task(feedback_model, temperature=0.5, max_tokens=1200, target=3.0, fallback=fast_model, priority=FEEDBACK),
+    }
@@ -0,0 +1,544 @@
+"""
+Compiled-language runners for the coding round (Java and C++).
+
+The candidate's function is placed inside a generated test harness, compiled once, and all
+tests are run in a single process: inputs are streamed on stdin and the harness writes one
+result line (with its own timing) per test to a results file, so nothing the candidate prints
+can garble them; stdout only gets a separator line before each test. Compiled artifacts are
+cached by source hash, so re-running unchanged code skips the compiler. Compile and run time
+are reported separately.
+
+The compiler and the test process get the same minimal environment as the Python sandbox
+and run in a throwaway directory (as the sandbox's unprivileged user, if one is set); the test
+process also runs under CPU time and memory limits. C++ submissions may only include standard
+headers by name, and only the compiler's messages about the submitted source are shown, so
+neither can be used to print other files on the server.
+
+Function signatures are described with a small set of types: int, long, bool, int[].
+"""
+
+import hashlib
+import math
+import os
+import re
+import shutil
+import signal
+import subprocess
+import tempfile
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # not available on Windows; no memory cap for the test process
+    resource = None
+
+from sandbox import private_dir, run_as, worker_env
+
+TEST_MARKER = "@@TEST"
+TEST_SEPARATOR = re.compile(r"\n" + TEST_MARKER + r" (\d+)\n")
+RESULTS_FILE = "results.txt"
+MAX_OUTPUT_CHARS = 10000
+LOCK_STRIPES = 64   # compile locks shared by cache keys (same key, same lock)
+
+# Preprocessor directives that read another file (also spelled with the %: digraph or with comments
+# after the #); only standard headers by name, e.g. <vector> or <bits/stdc++.h>, may be read
+FILE_DIRECTIVE = re.compile(r"^\s*(?:#|%:)(?:\s|/\*[\s\S]*?\*/)*(include|include_next|import|embed)\b(.*)$", re.M)
+SYSTEM_HEADER = re.compile(r"\s*<(?!/)(?![^>]*\.\.)[\w+./-]+>\s*(?://.*|/\*.*)?$")
+
+JAVA_TYPES = {"int": "int", "long": "long", "bool": "boolean", "int[]": "int[]"}
+CPP_TYPES = {"int": "int", "long": "long long", "bool": "bool", "int[]": "vector<int>"}
+
+
+# ---- Test encoding ----
+def encode_value(value, kind):
+    """Serialize one argument for the harness' stdin"""
+    if kind == "int[]":
+        return " ".join([str(len(value))] + [str(int(v)) for v in value])
+    if kind == "bool":
+        return "1" if value else "0"
+    return str(int(value))
+
+
+def decode_value(text, kind):
+    """Parse a value printed by the harness back into a Python value"""
+    tokens = text.split()
+    if kind == "int[]":
+        return [int(t) for t in tokens[1:1 + int(tokens[0])]]
+    if kind == "bool":
+        return tokens[0] in ("1", "true")
+    return int(tokens[0])
+
+
+def encode_tests(tests, signature):
+    lines = [str(len(tests))]
+    for args, _ in tests:
+        lines.append(" ".join(encode_value(a, k) for a, k in zip(args, signature["params"])))
+    return "\n".join(lines) + "\n"
+
+
+# ---- Harness templates ----
+JAVA_HARNESS = """import java.util.*;
+import java.io.*;
+
+public class Main {{
+{candidate}
+
+    static BufferedReader reader;
+    static StringTokenizer tokens;
+
+    static String next() throws IOException {{
+        while (tokens == null || !tokens.hasMoreTokens()) {{
+            tokens = new StringTokenizer(reader.readLine());
+        }}
+        return tokens.nextToken();
+    }}
+    static int readInt() throws IOException {{ return Integer.parseInt(next()); }}
+    static long readLong() throws IOException {{ return Long.parseLong(next()); }}
+    static boolean readBool() throws IOException {{ return next().equals("1"); }}
+    static int[] readIntArray() throws IOException {{
+        int[] a = new int[readInt()];
+        for (int i = 0; i < a.length; i++) a[i] = readInt();
+        return a;
+    }}
+    static String show(long v) {{ return Long.toString(v); }}
+    static String show(boolean v) {{ return v ? "1" : "0"; }}
+    static String show(int[] v) {{
+        StringBuilder sb = new StringBuilder().append(v.length);
+        for (int x : v) sb.append(' ').append(x);
+        return sb.toString();
+    }}
+
+    public static void main(String[] args) throws Exception {{
+        reader = new BufferedReader(new InputStreamReader(System.in));
+        PrintStream results = new PrintStream(new FileOutputStream(args[0]), true);
+        int t = readInt();
+        for (int i = 0; i < t; i++) {{
+{read_args}
+            System.out.print("\\n{marker} " + i + "\\n");
+            System.out.flush();
+            results.println("BEGIN " + i);
+            long start = System.nanoTime();
+            try {{
+                {returns} r = {name}({call_args});
+                long ns = System.nanoTime() - start;
+                results.println("OK " + ns + " " + show(r));
+            }} catch (Throwable e) {{
+                long ns = System.nanoTime() - start;
+                results.println("ERR " + ns + " " + e.toString().replace('\\n', ' '));
+            }}
+            System.out.flush();
+        }}
+    }}
+}}
+"""
+
+CPP_HARNESS = """#include <algorithm>
+#include <chrono>
+#include <climits>
+#include <cmath>
+#include <fstream>
+#include <iostream>
+#include <map>
+#include <numeric>
+#include <set>
+#include <stdexcept>
+#include <string>
+#include <unordered_map>
+#include <unordered_set>
+#include <vector>
+using namespace std;
+
+{candidate}
+
+static long long readLong() {{ long long v; cin >> v; return v; }}
+static vector<int> readIntArray() {{
+    size_t n; cin >> n;
+    vector<int> a(n);
+    for (auto& x : a) cin >> x;
+    return a;
+}}
+static string show(int v) {{ return to_string(v); }}
+static string show(long long v) {{ return to_string(v); }}
+static string show(bool v) {{ return v ? "1" : "0"; }}
+static string show(const vector<int>& v) {{
+    string s = to_string(v.size());
+    for (int x : v) {{ s += ' '; s += to_string(x); }}
+    return s;
+}}
+
+int main(int argc, char** argv) {{
+    ofstream results(argv[1]);
+    int t; cin >> t;
+    for (int i = 0; i < t; i++) {{
+{read_args}
+        cout << "\\n{marker} " << i << "\\n" << flush;
+        results << "BEGIN " << i << endl;
+        auto start = chrono::steady_clock::now();
+        auto elapsed = [&]() {{
+            return (long long)chrono::duration_cast<chrono::nanoseconds>(chrono::steady_clock::now() - start).count();
+        }};
+        try {{
+            {returns} r = {name}({call_args});
+            long long ns = elapsed();
+            results << "OK " << ns << " " << show(r) << endl;
+        }} catch (const exception& e) {{
+            long long ns = elapsed();
+            results << "ERR " << ns << " " << e.what() << endl;
+        }} catch (...) {{
+            long long ns = elapsed();
+            results << "ERR " << ns << " unknown exception" << endl;
+        }}
+        cout << flush;
+    }}
+    return 0;
+}}
+"""
+
+
+def java_harness(code, signature):
+    readers = {"int": "readInt()", "long": "readLong()", "bool": "readBool()", "int[]": "readIntArray()"}
+    read_args = "\n".join(
+        f"            {JAVA_TYPES[k]} a{i} = {readers[k]};" for i, k in enumerate(signature["params"])
+    )
+    return JAVA_HARNESS.format(
+        candidate=code,
+        read_args=read_args,
+        marker=TEST_MARKER,
+        returns=JAVA_TYPES[signature["returns"]],
+        name=signature["java_name"],
+        call_args=", ".join(f"a{i}" for i in range(len(signature["params"]))),
+    )
+
+
+def cpp_harness(code, signature):
+    readers = {"int": "(int)readLong()", "long": "readLong()", "bool": "(readLong() != 0)", "int[]": "readIntArray()"}
+    read_args = "\n".join(
+        f"        {CPP_TYPES[k]} a{i} = {readers[k]};" for i, k in enumerate(signature["params"])
+    )
+    return CPP_HARNESS.format(
+        candidate=code,
+        read_args=read_args,
+        marker=TEST_MARKER,
+        returns=CPP_TYPES[signature["returns"]],
+        name=signature["cpp_name"],
+        call_args=", ".join(f"a{i}" for i in range(len(signature["params"]))),
+    )
+
+
+# ---- Compilation cache ----
+class CompileCache:
+    """
+    Compiled artifacts stored under cache_dir/<sha256 of language + source>/.
+    Builds happen in a temp dir that is renamed into place, so concurrent sessions never
+    see half-written artifacts; a lock per key stripe avoids compiling the same source twice.
+    Once there are more than max_entries artifacts, the least recently used are removed.
+    """
+
+    def __init__(self, cache_dir, max_entries=500):
+        # Absolute, since the tests run with their own temp dir as cwd
+        self.cache_dir = os.path.abspath(cache_dir)
+        self.max_entries = max_entries
+        self._locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+        self._evict_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _lock_for(self, key):
+        return self._locks[int(key[:8], 16) % len(self._locks)]
+
+    def _evict(self):
+        """Remove the least recently used artifacts beyond max_entries (mtime is the last use)"""
+        with self._evict_lock:
+            entries = []
+            for entry in os.scandir(self.cache_dir):
+                if len(entry.name) == 64 and entry.is_dir():
+                    try:
+                        entries.append((entry.stat().st_mtime, entry.path))
+                    except OSError:
+                        pass
+            if len(entries) <= self.max_entries:
+                return
+            entries.sort()
+            for _, path in entries[:len(entries) - self.max_entries]:
+                shutil.rmtree(path, ignore_errors=True)
+                self.evictions += 1
+
+    def build(self, language, source, compile_fn):
+        """
+        Return (artifact_dir, error, compile_seconds, cached).
+        compile_fn(build_dir) compiles source into build_dir and returns an error string or None.
+        """
+        key = hashlib.sha256(f"{language}\0{source}".encode("utf-8")).hexdigest()
+        target = os.path.join(self.cache_dir, key)
+        with self._lock_for(key):
+            if os.path.isdir(target):
+                try:
+                    os.utime(target)
+                except OSError:
+                    pass
+                self.hits += 1
+                return target, None, 0.0, True
+            self.misses += 1
+            build_dir = tempfile.mkdtemp(prefix=f"{key[:12]}-", dir=self.cache_dir)
+            start = time.perf_counter()
+            error = compile_fn(build_dir)
+            seconds = time.perf_counter() - start
+            if error:
+                shutil.rmtree(build_dir, ignore_errors=True)
+                return None, error, seconds, False
+            try:
+                os.rename(build_dir, target)
+            except OSError:
+                # Another process finished the same build first
+                shutil.rmtree(build_dir, ignore_errors=True)
+        self._evict()
+        return target, None, seconds, False
+
+
+# ---- Runners ----
+def _limits(memory_mb, cpu_seconds):
+    """preexec_fn applying the test process' memory and CPU time caps (None where unsupported)"""
+    if resource is None or not (memory_mb or cpu_seconds):
+        return None
+
+    def apply():
+        if memory_mb:
+            limit = memory_mb * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+        if cpu_seconds:
+            # SIGXCPU at the soft limit, SIGKILL a second later if it is ignored
+            soft = int(math.ceil(cpu_seconds))
+            resource.setrlimit(resource.RLIMIT_CPU, (soft, soft + 1))
+
+    return apply
+
+
+def _own_diagnostics(output, source_name):
+    """
+    Compiler messages about the submitted source, with their quoted lines; messages located in
+    any other file are dropped, since they could quote that file's contents.
+    """
+    kept, keep = [], False
+    for line in output.splitlines():
+        if line and not line[0].isspace():
+            keep = line.startswith(source_name + ":")
+        if keep:
+            kept.append(line)
+    return "\n".join(kept)
+
+
+def _run_compiler(cmd, cwd, timeout, source_name, user=None):
+    try:
+        proc = subprocess.run(
+            cmd, cwd=cwd, env=worker_env(cwd), capture_output=True, text=True, timeout=timeout, **run_as(user)
+        )
+    except subprocess.TimeoutExpired:
+        return f"Compilation timed out after {timeout:g}s"
+    if proc.returncode != 0:
+        messages = _own_diagnostics(proc.stderr or proc.stdout, source_name)
+        return "Compilation failed:\n" + (messages or "(no messages about your code)")[:MAX_OUTPUT_CHARS]
+    return None
+
+
+class CompiledRunner:
+    """
+    Base runner: subclasses provide the harness, the compile command and the run command.
+    - run_timeout: wall-clock limit for the whole test process; its CPU time is capped at
+      cpu_factor times that
+    - memory_mb: address-space cap for the test process (None to skip, e.g. for the JVM)
+    - user: unprivileged account the compiler and the test process run as (see SandboxPool);
+      the compilation cache must then be outside the app directory
+    """
+
+    language = None
+    toolchain = ()
+    source_name = None
+    cpu_factor = 1.0
+
+    def __init__(self, cache, compile_timeout=30.0, run_timeout=5.0, memory_mb=256, user=None):
+        self.cache = cache
+        self.compile_timeout = compile_timeout
+        self.run_timeout = run_timeout
+        self.memory_mb = memory_mb
+        self.user = user
+
+    def available(self):
+        return all(shutil.which(tool) for tool in self.toolchain)
+
+    def harness(self, code, signature):
+        raise NotImplementedError
+
+    def check_source(self, code):
+        """Error message for code the runner refuses to compile, or None"""
+        return None
+
+    def compile_cmd(self, build_dir):
+        raise NotImplementedError
+
+    def run_cmd(self, artifact_dir, results_path):
+        raise NotImplementedError
+
+    def _compile(self, source):
+        def compile_fn(build_dir):
+            with open(os.path.join(build_dir, self.source_name), "w") as f:
+                f.write(source)
+            if self.user:
+                for path in (build_dir, os.path.join(build_dir, self.source_name)):
+                    shutil.chown(path, self.user)
+            return _run_compiler(
+                self.compile_cmd(build_dir), build_dir, self.compile_timeout, self.source_name, self.user
+            )
+
+        return self.cache.build(self.language, source, compile_fn)
+
+    def run(self, code, signature, tests, check=None):
+        """
+        Compile (or reuse) the harness and run every (args, expected) test in one process.
+        check(args, expected, output) decides correctness (default: output == expected).
+        Returns the same shape as the Python sandbox plus compile/run timings.
+        """
+        result = {"error": None, "passed": 0, "total": len(tests), "details": [], "runs": [],
+                  "stdout": "", "stderr": "", "compile_seconds": 0.0, "run_seconds": 0.0,
+                  "compile_cached": False}
+        if not self.available():
+            result["error"] = f"{self.language} toolchain is not installed on this server"
+            return result
+        result["error"] = self.check_source(code)
+        if result["error"]:
+            return result
+
+        artifact_dir, error, result["compile_seconds"], result["compile_cached"] = self._compile(
+            self.harness(code, signature)
+        )
+        if error:
+            result["error"] = error
+            return result
+
+        # The test process runs in a throwaway directory, where the harness also writes its results
+        run_dir = private_dir("run-", self.user)
+        results_path = os.path.join(run_dir, RESULTS_FILE)
+        start = time.perf_counter()
+        try:
+            proc = subprocess.Popen(
+                self.run_cmd(artifact_dir, results_path), cwd=run_dir, env=worker_env(run_dir), text=True,
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                preexec_fn=_limits(self.memory_mb, self.run_timeout * self.cpu_factor), **run_as(self.user),
+            )
+            timed_out = False
+            try:
+                stdout, stderr = proc.communicate(encode_tests(tests, signature), timeout=self.run_timeout)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                stdout, stderr = proc.communicate()
+                timed_out = True
+            result["run_seconds"] = time.perf_counter() - start
+            result["stderr"] = stderr[:MAX_OUTPUT_CHARS]
+            try:
+                with open(results_path, encoding="utf-8", errors="replace") as f:
+                    results = f.read()
+            except OSError:
+                results = ""
+        finally:
+            shutil.rmtree(run_dir, ignore_errors=True)
+
+        if timed_out:
+            failure = f"Timed out after {self.run_timeout:g}s"
+        elif proc.returncode == -getattr(signal, "SIGXCPU", 0):
+            failure = "CPU time limit exceeded"
+        elif proc.returncode != 0:
+            failure = f"Runtime error (exit code {proc.returncode})"
+        else:
+            failure = "No result"
+        self._collect(result, stdout, results, tests, signature, failure, check or (lambda args, exp, out: out == exp))
+        return result
+
+    @staticmethod
+    def _parse_results(text):
+        """{test index: (status, seconds, payload)} and the index of a test that started but never finished"""
+        outputs, current = {}, None
+        for line in text.splitlines():
+            kind, _, rest = line.partition(" ")
+            try:
+                if kind == "BEGIN":
+                    current = int(rest)
+                elif kind in ("OK", "ERR") and current is not None:
+                    ns, _, payload = rest.partition(" ")
+                    outputs[current] = (kind, int(ns) / 1e9, payload)
+                    current = None
+            except ValueError:
+                break   # torn last line of a killed process
+        return outputs, current
+
+    def _collect(self, result, stdout, results, tests, signature, failure, check):
+        """Match harness results to tests; candidate output after a test's separator belongs to that test"""
+        outputs, current = self._parse_results(results)
+        parts = TEST_SEPARATOR.split(stdout)
+        result["stdout"] = parts[0][:MAX_OUTPUT_CHARS]
+        printed = {int(index): text[:MAX_OUTPUT_CHARS] for index, text in zip(parts[1::2], parts[2::2])}
+
+        # The test in progress when the process died gets the failure; later ones never ran
+        failed_index = current if current is not None else len(outputs)
+        for i, (args, exp) in enumerate(tests):
+            shown = args[0] if len(args) == 1 else args
+            if i in outputs:
+                status, seconds, payload = outputs[i]
+                if status == "OK":
+                    out = decode_value(payload, signature["returns"])
+                    ok = check(args, exp, out)
+                else:
+                    out, ok = payload, False
+                run = {"seconds": seconds, "cpu_seconds": None, "stdout": printed.get(i, ""), "stderr": ""}
+            else:
+                out = failure if i == failed_index else "Not run"
+                ok = False
+                run = {"seconds": None, "cpu_seconds": None, "stdout": printed.get(i, ""), "stderr": ""}
+            result["details"].append((shown, exp, out, ok))
+            result["runs"].append(run)
+            if ok:
+                result["passed"] += 1
+
+
+class JavaRunner(CompiledRunner):
+    language = "Java"
+    toolchain = ("javac", "java")
+    source_name = "Main.java"
+    cpu_factor = 4.0    # the JVM's compiler and GC threads add to the process' CPU time
+
+    def __init__(self, cache, compile_timeout=30.0, run_timeout=5.0, memory_mb=256, user=None):
+        # The JVM reserves far more address space than it uses, so cap the heap instead
+        super().__init__(cache, compile_timeout, run_timeout, memory_mb=None, user=user)
+        self.heap_mb = memory_mb
+
+    def harness(self, code, signature):
+        return java_harness(code, signature)
+
+    def compile_cmd(self, build_dir):
+        return ["javac", "-encoding", "UTF-8", self.source_name]
+
+    def run_cmd(self, artifact_dir, results_path):
+        return ["java", f"-Xmx{self.heap_mb}m", "-Xss64m", "-XX:+UseSerialGC", "-cp", artifact_dir, "Main", results_path]
+
+
+class CppRunner(CompiledRunner):
+    language = "C++"
+    toolchain = ("g++",)
+    source_name = "main.cpp"
+
+    def harness(self, code, signature):
+        return cpp_harness(code, signature)
+
+    def check_source(self, code):
+        code = code.replace("\\\n", "")   # line continuations could split a directive
+        for match in FILE_DIRECTIVE.finditer(code):
+            if match.group(1) != "include" or not SYSTEM_HEADER.match(match.group(2)):
+                return f"Only standard headers can be included (e.g. #include <vector>), not: {match.group(0).strip()}"
+        return None
+
+    def compile_cmd(self, build_dir):
+        return ["g++", "-std=c++17", "-O2", "-o", "main", self.source_name]
+
+    def run_cmd(self, artifact_dir, results_path):
+        return [os.path.join(artifact_dir, "main"), results_path]
@@ -0,0 +1,505 @@
+"""
+Isolated code execution for candidate submissions.
+
+Candidate code runs in a pool of pre-warmed worker processes instead of the Streamlit
+server process. Each test has a wall-clock and CPU time limit, workers run under a memory
+cap, stdout/stderr are captured per test, and a worker that crashes or times out is killed
+and replaced in the background. By default a worker is also retired after one submission,
+so nothing a submission does (monkeypatching builtins, leaked threads) outlives it.
+
+Workers are fresh interpreters started in isolated mode, from a private copy of this module,
+with a minimal environment and an empty temporary working directory. Before any candidate
+code runs, an audit hook confines the worker: no files outside the interpreter's own and the
+working directory (so not the app directory, its .env or /proc), no new processes and no
+ctypes. Replies to the server are JSON, never pickles, so nothing candidate code returns is
+executed in the server. For OS-level isolation as well, workers can run as an unprivileged
+user that has no access to the app directory.
+"""
+
+import contextlib
+import io
+import json
+import math
+import multiprocessing
+import os
+import queue
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from multiprocessing import connection
+
+try:
+    import resource
+except ImportError:  # not available on Windows; limits are then wall-clock only
+    resource = None
+
+try:
+    import pwd
+except ImportError:  # not available on Windows; candidate code then runs as the server's user
+    pwd = None
+
+MAX_OUTPUT_CHARS = 10000
+MIN_SAMPLE_SECONDS = 0.002  # profiling: batch fast calls until a sample is at least this long
+MAX_BATCH = 1000
+MAX_BATCH_ELEMENTS = 1000000  # bounds the memory used by prepared copies of list arguments
+MAX_REPLY_BYTES = 64 * 1024 * 1024  # a longer reply from a worker counts as a crash
+
+# Run by `python -I -B -c` with the directory of a copy of this module: connect to the server
+# over the inherited pipe and serve requests
+BOOTSTRAP = "import sys; sys.path.insert(0, sys.argv[1]); import sandbox; sandbox._worker_entry(int(sys.argv[2]), int(sys.argv[3]))"
+
+# Audit events that would let candidate code out of the worker: new processes, native code
+BLOCKED_EVENTS = frozenset({
+    "os.system", "os.exec", "os.posix_spawn", "os.spawn", "os.fork", "os.forkpty", "subprocess.Popen",
+    "ctypes.dlopen", "ctypes.dlsym", "ctypes.cdata", "ctypes.addressof", "ctypes.call_function",
+})
+# Audit events whose path arguments must stay inside the worker's directories
+PATH_EVENTS = frozenset({
+    "open", "os.rename", "os.remove", "os.rmdir", "os.mkdir", "os.truncate", "os.chmod", "os.chown",
+    "os.link", "os.symlink", "os.utime", "os.chflags", "os.setxattr", "os.removexattr",
+})
+
+
+# ---- Worker process ----
+def _set_memory_limit(memory_mb):
+    if resource is None or not memory_mb:
+        return
+    limit = memory_mb * 1024 * 1024
+    with contextlib.suppress(ValueError, OSError):
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def _set_cpu_limit(cpu_seconds):
+    """Raise SIGXCPU (which terminates the worker) after cpu_seconds more CPU time"""
+    if resource is None or not cpu_seconds:
+        return
+    used = time.process_time()
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    soft = int(math.ceil(used + cpu_seconds))
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    with contextlib.suppress(ValueError, OSError):
+        resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+def _confine(allowed):
+    """
+    Keep candidate code in the worker with an audit hook (which can't be removed once added):
+    file access only inside the allowed directories, no new processes and no ctypes.
+    """
+    roots = tuple(os.path.join(os.path.realpath(d), "") for d in allowed)
+
+    def inside(path):
+        if isinstance(path, int):   # an already open descriptor
+            return True
+        return os.path.join(os.path.realpath(os.fsdecode(path)), "").startswith(roots)
+
+    def hook(event, args):
+        if event in BLOCKED_EVENTS:
+            raise PermissionError(f"{event} is not allowed here")
+        if event in PATH_EVENTS:
+            for arg in args[:1] if event == "open" else args:
+                if isinstance(arg, (str, bytes, os.PathLike)) and not inside(arg):
+                    raise PermissionError(f"Access to {os.fsdecode(arg)} is not allowed here")
+
+    sys.addaudithook(hook)
+
+
+def _portable(value):
+    """Only plain JSON data goes back to the server; anything else as its repr"""
+    try:
+        return json.loads(json.dumps(value))
+    except Exception:
+        return repr(value)
+
+
+def _reply(conn, message):
+    """Replies are JSON: the server never unpickles anything candidate code could have made"""
+    conn.send_bytes(json.dumps(message).encode("utf-8"))
+
+
+def _captured(func, *args):
+    """Run func(*args) with stdout/stderr captured; returns (value, error, stdout, stderr)"""
+    out, err = io.StringIO(), io.StringIO()
+    value, error = None, None
+    with contextlib.redirect_stdout(out), contextlib.redirect_stderr(err):
+        try:
+            value = func(*args)
+        except BaseException as e:  # SystemExit/KeyboardInterrupt from candidate code too
+            error = f"{type(e).__name__}: {e}" if str(e) else type(e).__name__
+    return value, error, out.getvalue()[:MAX_OUTPUT_CHARS], err.getvalue()[:MAX_OUTPUT_CHARS]
+
+
+def _fresh(args):
+    """Copy list arguments so an in-place algorithm sees the same input on every repetition"""
+    return [list(a) if isinstance(a, list) else a for a in args]
+
+
+def _time_batch(func, batch):
+    """Average seconds per call over a batch of prepared argument lists (output discarded)"""
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        start = time.perf_counter()
+        for call_args in batch:
+            func(*call_args)
+        return (time.perf_counter() - start) / len(batch)
+
+
+def _profile_calls(func, args, repeats, budget):
+    """
+    Time func on one input size. Fast calls are batched so every sample spans at least
+    MIN_SAMPLE_SECONDS; a single call slower than budget is measured once and reported as-is.
+    """
+    try:
+        probe = _fresh(args)
+        first = _time_batch(func, [probe])
+        if first >= budget:
+            return {"times": [first], "peak_bytes": None, "error": None}
+        # Inputs the function leaves untouched can be reused across a batch; otherwise each call
+        # gets its own copy, prepared outside the timed region
+        reusable = probe == list(args)
+        elements = sum(len(a) for a in args if isinstance(a, list)) or 1
+        per_sample = min(MAX_BATCH, int(MIN_SAMPLE_SECONDS / max(first, 1e-9)))
+        if not reusable:
+            per_sample = min(per_sample, MAX_BATCH_ELEMENTS // elements)
+        per_sample = max(1, per_sample)
+        times = []
+        for _ in range(repeats):
+            batch = [probe] * per_sample if reusable else [_fresh(args) for _ in range(per_sample)]
+            times.append(_time_batch(func, batch))
+
+        # Separate traced run so tracemalloc overhead doesn't skew the timings
+        call_args = _fresh(args)
+        tracemalloc.start()
+        try:
+            _time_batch(func, [call_args])
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        return {"times": times, "peak_bytes": peak, "error": None}
+    except BaseException as e:
+        return {"times": [], "peak_bytes": None, "error": f"{type(e).__name__}: {e}"}
+
+
+def _worker_main(conn, memory_mb):
+    _set_memory_limit(memory_mb)
+    func = None
+    while True:
+        try:
+            msg = conn.recv()
+        except (EOFError, OSError):
+            return
+        kind = msg[0]
+
+        if kind == "load":
+            _, code, func_name = msg
+            ns = {}
+
+            def load():
+                exec(code, ns)
+                return ns.get(func_name)
+
+            func, error, stdout, stderr = _captured(load)
+            if error is None and not callable(func):
+                error = f"Function {func_name} missing"
+            _reply(conn, ("loaded", error, stdout, stderr))
+
+        elif kind == "run":
+            _, args, cpu_seconds = msg
+            _set_cpu_limit(cpu_seconds)
+            wall_start = time.perf_counter()
+            cpu_start = time.process_time()
+            value, error, stdout, stderr = _captured(func, *args)
+            result = {
+                "output": error if error is not None else _portable(value),
+                "error": error,
+                "stdout": stdout,
+                "stderr": stderr,
+                "seconds": time.perf_counter() - wall_start,
+                "cpu_seconds": time.process_time() - cpu_start,
+            }
+            _reply(conn, ("result", result))
+
+        elif kind == "profile":
+            _, args, repeats, budget, cpu_seconds = msg
+            _set_cpu_limit(cpu_seconds * (repeats + 2))
+            _reply(conn, ("profiled", _profile_calls(func, args, repeats, budget)))
+
+        elif kind == "stop":
+            return
+
+
+def _worker_entry(handle, memory_mb):
+    conn = connection.PipeConnection(handle) if os.name == "nt" else connection.Connection(handle)
+    # The interpreter's own files (for imports) and the worker's temp dir
+    _confine([os.getcwd(), os.path.dirname(__file__), sys.prefix, sys.exec_prefix, sys.base_prefix, sys.base_exec_prefix])
+    _worker_main(conn, memory_mb)
+
+
+# ---- Server side ----
+def _equal(args, expected, output):
+    return output == expected
+
+
+def worker_env(home):
+    """The whole environment of candidate code: enough to start Python or a toolchain, no server settings"""
+    env = {"PATH": os.environ.get("PATH", os.defpath), "HOME": home, "LANG": "C.UTF-8"}
+    if os.name == "nt":
+        env["SYSTEMROOT"] = os.environ.get("SYSTEMROOT", r"C:\Windows")
+    return env
+
+
+def run_as(user):
+    """Popen arguments starting a process as user (an unprivileged account; empty: the server's)"""
+    if not user or pwd is None:
+        return {}
+    entry = pwd.getpwnam(user)
+    return {"user": entry.pw_uid, "group": entry.pw_gid, "extra_groups": []}
+
+
+def private_dir(prefix, user=None):
+    """New temp dir for candidate code, owned by user if it runs as one"""
+    path = tempfile.mkdtemp(prefix=prefix)
+    if user and pwd is not None:
+        shutil.chown(path, user, pwd.getpwnam(user).pw_gid)
+    return path
+
+
+def module_copy():
+    """Temp dir with a copy of this module, so workers don't get the app directory on sys.path"""
+    directory = tempfile.mkdtemp(prefix="sandbox-module-")
+    shutil.copy(os.path.abspath(__file__), os.path.join(directory, "sandbox.py"))
+    os.chmod(directory, 0o755)
+    return directory
+
+
+class Worker:
+    def __init__(self, memory_mb, module_dir, user=None):
+        self.conn, child_conn = multiprocessing.Pipe()
+        self.cwd = private_dir("sandbox-", user)
+        handle = child_conn.fileno()
+        # Only the worker's end of the pipe is inherited
+        if os.name == "nt":
+            os.set_handle_inheritable(handle, True)
+            inherit = {"startupinfo": subprocess.STARTUPINFO(lpAttributeList={"handle_list": [handle]})}
+        else:
+            inherit = {"pass_fds": (handle,)}
+        self.process = subprocess.Popen(
+            [sys.executable, "-I", "-B", "-c", BOOTSTRAP, module_dir, str(handle), str(memory_mb)],
+            env=worker_env(self.cwd), cwd=self.cwd, stdin=subprocess.DEVNULL, **inherit, **run_as(user),
+        )
+        child_conn.close()
+        self.jobs = 0
+
+    def request(self, msg, timeout):
+        """Send msg and wait for the reply; raises TimeoutError or EOFError if the worker dies"""
+        self.conn.send(msg)
+        if not self.conn.poll(timeout):
+            raise TimeoutError
+        try:
+            return json.loads(self.conn.recv_bytes(MAX_REPLY_BYTES))
+        except ValueError:
+            raise OSError("Malformed reply from worker")
+
+    def alive(self):
+        return self.process.poll() is None
+
+    def exit_code(self, timeout=0.5):
+        """Exit status of a worker that closed its pipe (None if it is somehow still running)"""
+        with contextlib.suppress(subprocess.TimeoutExpired):
+            self.process.wait(timeout)
+        return self.process.returncode
+
+    def kill(self):
+        with contextlib.suppress(Exception):
+            self.process.kill()
+            self.process.wait(1)
+        with contextlib.suppress(Exception):
+            self.conn.close()
+        shutil.rmtree(self.cwd, ignore_errors=True)
+
+
+class SandboxPool:
+    """
+    Pool of pre-warmed worker processes running candidate functions against tests.
+    - wall_timeout / cpu_timeout: per-test limits in seconds
+    - memory_mb: address-space cap for each worker
+    - max_jobs_per_worker: submissions a worker serves before it is replaced
+    - user: unprivileged account the workers run as (needs access to the Python installation
+      but not to the app directory); empty to run them as the server's user
+    """
+
+    def __init__(self, size=2, memory_mb=256, wall_timeout=2.0, cpu_timeout=1.0,
+                 load_timeout=5.0, max_jobs_per_worker=1, user=None):
+        self.size = size
+        self.memory_mb = memory_mb
+        self.wall_timeout = wall_timeout
+        self.cpu_timeout = cpu_timeout
+        self.load_timeout = load_timeout
+        self.max_jobs_per_worker = max_jobs_per_worker
+        self.user = user
+        self._module_dir = module_copy()
+        self._lock = threading.Lock()
+        self._workers = set()   # every worker started, so close() can stop them all
+        self._closed = False
+        self._idle = queue.Queue()
+        self.recycled = 0
+        for _ in range(size):
+            self._idle.put(self._worker())
+
+    def _worker(self):
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("The sandbox pool is closed")
+            self._workers = {w for w in self._workers if w.alive()}
+            worker = Worker(self.memory_mb, self._module_dir, self.user)
+            self._workers.add(worker)
+            return worker
+
+    def _acquire(self):
+        while True:
+            try:
+                worker = self._idle.get(timeout=1.0)
+            except queue.Empty:
+                # Every worker is busy (or still starting) - start one on demand
+                return self._worker()
+            if worker.alive():
+                return worker
+            worker.kill()
+
+    def _replace_later(self):
+        def replace():
+            with contextlib.suppress(RuntimeError):     # closed meanwhile
+                self._idle.put(self._worker())
+
+        threading.Thread(target=replace, daemon=True).start()
+
+    def _release(self, worker, healthy):
+        worker.jobs += 1
+        if healthy and worker.alive() and worker.jobs < self.max_jobs_per_worker:
+            self._idle.put(worker)
+            return
+        worker.kill()
+        self.recycled += 1
+        if self._idle.qsize() < self.size:
+            self._replace_later()
+
+    def _load(self, worker, code, func_name):
+        try:
+            _, error, stdout, stderr = worker.request(("load", code, func_name), self.load_timeout)
+            return error, stdout, stderr
+        except TimeoutError:
+            return f"Code took longer than {self.load_timeout:g}s to load", "", ""
+        except (EOFError, OSError):
+            return "Code crashed the interpreter while loading", "", ""
+
+    def run(self, code, func_name, tests, check=None):
+        """
+        Run func_name from code on each (args, expected) test.
+        check(args, expected, output) decides correctness (default: output == expected); it runs
+        here in the server so a submission cannot tamper with it.
+        Returns {"error", "passed", "total", "details": [(input, expected, output, ok)], "runs": [...]}
+        where "runs" holds seconds, cpu_seconds, stdout and stderr for each test.
+        """
+        check = check or _equal
+        result = {"error": None, "passed": 0, "total": len(tests), "details": [], "runs": [],
+                  "stdout": "", "stderr": ""}
+        worker = self._acquire()
+        error, result["stdout"], result["stderr"] = self._load(worker, code, func_name)
+        if error:
+            result["error"] = error
+            self._release(worker, healthy=False)
+            return result
+
+        for args, exp in tests:
+            try:
+                _, run = worker.request(("run", args, self.cpu_timeout), self.wall_timeout)
+                ok = run["error"] is None and check(args, exp, run["output"])
+                healthy = True
+            except TimeoutError:
+                run = {"output": f"Timed out after {self.wall_timeout:g}s"}
+                ok = healthy = False
+            except (EOFError, OSError):
+                # SIGXCPU, MemoryError escalation or a hard crash all end the process
+                # The pipe closes before the process is reaped: wait for its exit status
+                reason = "CPU time limit exceeded" if worker.exit_code() == -24 else "Worker crashed"
+                run = {"output": reason}
+                ok = healthy = False
+
+            shown = args[0] if len(args) == 1 else args
+            result["details"].append((shown, exp, run["output"], ok))
+            result["runs"].append({
+                "seconds": run.get("seconds"),
+                "cpu_seconds": run.get("cpu_seconds"),
+                "stdout": run.get("stdout", ""),
+                "stderr": run.get("stderr", ""),
+            })
+            if ok:
+                result["passed"] += 1
+
+            if not healthy:
+                # Recycle the broken worker and reload the code in a fresh one for the next test
+                self._release(worker, healthy=False)
+                worker = self._acquire()
+                error, _, _ = self._load(worker, code, func_name)
+                if error:
+                    self._release(worker, healthy=False)
+                    for rest_args, rest_exp in tests[len(result["details"]):]:
+                        shown = rest_args[0] if len(rest_args) == 1 else rest_args
+                        result["details"].append((shown, rest_exp, error, False))
+                        result["runs"].append({"seconds": None, "cpu_seconds": None, "stdout": "", "stderr": ""})
+                    return result
+
+        self._release(worker, healthy=True)
+        return result
+
+    def profile(self, code, func_name, inputs, repeats=5, budget=0.25):
+        """
+        Time func_name on each (n, args) from inputs, which is consumed lazily.
+        Each size gets `repeats` samples (median kept) plus one run under tracemalloc for peak memory.
+        Stops growing n once a single call takes longer than budget seconds, on an error or a timeout.
+        Returns {"error", "measurements": [{"n", "seconds", "min_seconds", "peak_bytes"}]}.
+        """
+        profile = {"error": None, "measurements": []}
+        worker = self._acquire()
+        error, _, _ = self._load(worker, code, func_name)
+        if error:
+            profile["error"] = error
+            self._release(worker, healthy=False)
+            return profile
+
+        healthy = True
+        for n, args in inputs:
+            try:
+                _, m = worker.request(
+                    ("profile", args, repeats, budget, self.cpu_timeout),
+                    self.wall_timeout * (repeats + 2),
+                )
+            except (TimeoutError, EOFError, OSError):
+                healthy = False
+                break
+            if m["error"] is not None or not m["times"]:
+                break
+            times = sorted(m["times"])
+            profile["measurements"].append({
+                "n": n, "seconds": times[len(times) // 2], "min_seconds": times[0], "peak_bytes": m["peak_bytes"],
+            })
+            if times[0] >= budget:
+                break
+
+        self._release(worker, healthy=healthy)
+        return profile
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            workers = list(self._workers)
+        # Workers still starting would otherwise import from the module copy once it's gone
+        for worker in workers:
+            worker.kill()
+        while not self._idle.empty():
+            self._idle.get_nowait().kill()
+        shutil.rmtree(self._module_dir, ignore_errors=True)
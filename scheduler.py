@@ -0,0 +1,213 @@
+"""
+Process-wide scheduler for model API requests.
+
+All sessions share the account's rate limits, so every request first takes its share of a
+per-server budget: one request from the requests-per-minute bucket and its estimated tokens
+from the tokens-per-minute bucket. The API limits each model separately, so every model gets
+its own pair of buckets (with the limits of its budget, "chat" or "audio") and its own line.
+When a model's budget is used up, its requests wait in line instead of all hitting the API
+and failing together, while requests for other models go ahead:
+- by priority: live interview turns (and transcriptions) before feedback, feedback before
+  background pre-generation
+- fairly within a priority: sessions take turns, so one session's burst of calls can't starve
+  the others
+- lower priorities must leave a reserve in the buckets, so pre-generation never uses up the
+  budget that live turns need
+A 429 from the API pauses everyone's requests for that model until its Retry-After, rather
+than every session retrying on its own.
+"""
+
+import threading
+import time
+from collections import OrderedDict, deque
+
+from llm import LLMError
+
+LIVE, FEEDBACK, BACKGROUND = 0, 1, 2
+PRIORITY_NAMES = {LIVE: "live", FEEDBACK: "feedback", BACKGROUND: "background"}
+
+# Share of each bucket a request of this priority must leave untouched
+DEFAULT_RESERVE = {LIVE: 0.0, FEEDBACK: 0.1, BACKGROUND: 0.5}
+
+
+class SchedulerBusyError(LLMError):
+    """The request could not get a slot in time; retrying right away would only add load"""
+
+
+class TokenBucket:
+    """per_minute units, refilled continuously; the burst capacity is one minute's worth"""
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount, reserve):
+        """Seconds until amount can be taken leaving reserve (a share of capacity) behind"""
+        needed = min(amount, self.capacity) + reserve * self.capacity - self.level
+        return max(needed, 0.0) / self.rate
+
+    def take(self, amount):
+        self.level -= min(amount, self.capacity)
+
+
+class _Waiter:
+    def __init__(self, key, tokens, priority, session):
+        self.key = key
+        self.tokens = tokens
+        self.priority = priority
+        self.session = session
+        self.since = time.monotonic()
+
+
+class RateScheduler:
+    """
+    - budgets: {name: (requests_per_minute, tokens_per_minute)} for each model of that kind;
+      0 or None leaves that limit off
+    """
+
+    def __init__(self, budgets, reserve=None, window=200, default_pause=1.0):
+        self.budgets = dict(budgets)
+        self.reserve = dict(DEFAULT_RESERVE, **(reserve or {}))
+        self.default_pause = default_pause
+        self._cond = threading.Condition()
+        # Per (budget, model): its buckets, and its line of waiters (priority -> session -> deque)
+        self._buckets = {}
+        self._queues = {}
+        self._paused_until = {}
+        self._local = threading.local()
+        self._waits = deque(maxlen=window)
+        self._last_wait = OrderedDict()    # session -> seconds, most recent sessions only
+        self._stats = {"granted": 0, "shed": 0, "rate_limited": 0}
+
+    # ---- Sessions ----
+    def bind_session(self, session):
+        """Requests made from this thread belong to session (for fair turn-taking)"""
+        self._local.session = session
+
+    def current_session(self):
+        return getattr(self._local, "session", None)
+
+    # ---- Queue ----
+    def limited(self, budget):
+        rpm, tpm = self.budgets.get(budget) or (None, None)
+        return bool(rpm or tpm)
+
+    def _line(self, key):
+        """Buckets and queues of a (budget, model), created on its first request"""
+        if key not in self._buckets:
+            rpm, tpm = self.budgets[key[0]]
+            self._buckets[key] = (TokenBucket(rpm) if rpm else None, TokenBucket(tpm) if tpm else None)
+            self._queues[key] = {p: OrderedDict() for p in PRIORITY_NAMES}
+            self._paused_until.setdefault(key, 0.0)
+        return self._queues[key]
+
+    def _head(self, key):
+        """Only requests for the same buckets are ordered against each other"""
+        queues = self._queues[key]
+        for priority in sorted(queues):
+            sessions = queues[priority]
+            if sessions:
+                return next(iter(sessions.values()))[0]
+        return None
+
+    def _remove(self, waiter, granted):
+        sessions = self._queues[waiter.key][waiter.priority]
+        line = sessions[waiter.session]
+        line.remove(waiter)
+        if not line:
+            del sessions[waiter.session]
+        elif granted:
+            sessions.move_to_end(waiter.session)    # the session's next request waits its turn
+
+    def _wait_time(self, waiter, now):
+        if now < self._paused_until[waiter.key]:
+            return self._paused_until[waiter.key] - now
+        rpm, tpm = self._buckets[waiter.key]
+        reserve = self.reserve[waiter.priority]
+        wait = 0.0
+        for bucket, amount in ((rpm, 1), (tpm, waiter.tokens)):
+            if bucket is not None:
+                bucket.refill(now)
+                wait = max(wait, bucket.wait_time(amount, reserve))
+        return wait
+
+    def acquire(self, budget, tokens=0, priority=LIVE, session=None, timeout=None, model=None):
+        """
+        Block until a request to model may be sent; returns the seconds waited.
+        Raises SchedulerBusyError if that takes longer than timeout.
+        """
+        if not self.limited(budget):
+            return 0.0
+        key = (budget, model)
+        waiter = _Waiter(key, tokens, priority, session)
+        deadline = waiter.since + timeout if timeout is not None else None
+        with self._cond:
+            self._line(key)[priority].setdefault(session, deque()).append(waiter)
+            while True:
+                now = time.monotonic()
+                wait = None
+                if self._head(key) is waiter:
+                    wait = self._wait_time(waiter, now)
+                    if wait <= 0:
+                        rpm, tpm = self._buckets[key]
+                        if rpm is not None:
+                            rpm.take(1)
+                        if tpm is not None:
+                            tpm.take(tokens)
+                        self._remove(waiter, granted=True)
+                        self._cond.notify_all()
+                        waited = now - waiter.since
+                        self._waits.append(waited)
+                        self._last_wait[session] = waited
+                        self._last_wait.move_to_end(session)
+                        if len(self._last_wait) > 1000:
+                            self._last_wait.popitem(last=False)
+                        self._stats["granted"] += 1
+                        return waited
+                if deadline is not None and now >= deadline:
+                    self._remove(waiter, granted=False)
+                    self._cond.notify_all()
+                    self._stats["shed"] += 1
+                    raise SchedulerBusyError("The interview service is very busy right now.")
+                if deadline is not None:
+                    wait = min(wait, deadline - now) if wait is not None else deadline - now
+                self._cond.wait(wait)
+
+    def rate_limited(self, budget, retry_after=None, model=None):
+        """The API answered 429 (our estimates ran ahead of it): pause the model's requests until Retry-After"""
+        with self._cond:
+            self._stats["rate_limited"] += 1
+            key = (budget, model)
+            resume = time.monotonic() + (retry_after or self.default_pause)
+            self._paused_until[key] = max(self._paused_until.get(key, 0.0), resume)
+            self._cond.notify_all()
+
+    # ---- Stats ----
+    def queue_depth(self, priority=None):
+        with self._cond:
+            priorities = [priority] if priority is not None else list(PRIORITY_NAMES)
+            return sum(
+                len(line) for queues in self._queues.values() for p in priorities for line in queues[p].values()
+            )
+
+    def last_wait(self, session):
+        with self._cond:
+            return self._last_wait.get(session)
+
+    def stats(self):
+        with self._cond:
+            waits = sorted(self._waits)
+            stats = dict(self._stats)
+            stats["queued"] = {
+                name: sum(len(line) for queues in self._queues.values() for line in queues[p].values())
+                for p, name in PRIORITY_NAMES.items()
+            }
+        stats["p95_wait"] = waits[min(len(waits) - 1, int(0.95 * len(waits)))] if waits else None
+        stats["mean_wait"] = sum(waits) / len(waits) if waits else None
+        return stats
@@ -0,0 +1,110 @@
+"""
+Speculative generation of model turns whose prompt is known before they are needed.
+
+A speculation is keyed by a fingerprint of the exact prompt. When the turn is actually needed
+the caller rebuilds the prompt: if the fingerprint still matches, the (possibly still running)
+speculative result is used; otherwise the speculation is stale and is discarded. When one of
+several possible turns is needed, the others are discarded (a call that has already started
+runs to the end, but its result is dropped). The Speculator itself (worker threads and
+statistics) is shared by the whole process.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+def prompt_key(messages):
+    return hashlib.sha256(json.dumps(messages, sort_keys=True).encode()).hexdigest()
+
+
+class Speculation:
+    """One in-flight or finished speculative call"""
+
+    def __init__(self, key):
+        self.key = key
+        self.future = None
+        self.started = time.perf_counter()
+        self.finished = None   # set by the worker when the call returns
+
+
+class Speculator:
+    """Runs speculative calls on a small thread pool and tracks how much waiting they saved"""
+
+    def __init__(self, workers=4):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="speculate")
+        self._lock = threading.Lock()
+        self.started = 0
+        self.hits = 0
+        self.misses = 0
+        self.discarded = 0
+        self.seconds_saved = 0.0
+
+    def speculate(self, messages, fn, *args, **kwargs):
+        """Start fn(messages, *args, **kwargs) in the background; returns a Speculation"""
+        spec = Speculation(prompt_key(messages))
+
+        def run():
+            try:
+                return fn(messages, *args, **kwargs)
+            finally:
+                spec.finished = time.perf_counter()
+
+        spec.future = self._executor.submit(run)
+        with self._lock:
+            self.started += 1
+        return spec
+
+    def is_current(self, spec, messages):
+        return spec is not None and spec.key == prompt_key(messages)
+
+    def discard(self, spec):
+        """Drop a speculation that will not be used (cancelled if it hasn't started yet)"""
+        if spec is None:
+            return
+        spec.future.cancel()
+        with self._lock:
+            self.discarded += 1
+
+    def resolve(self, spec, messages, timeout):
+        """
+        Result of the speculation if it was made for exactly these messages and succeeds within
+        timeout seconds; otherwise None (the caller generates the turn itself). Stale
+        speculations are discarded.
+        """
+        if spec is None or spec.key != prompt_key(messages):
+            self.discard(spec)
+            with self._lock:
+                self.misses += 1
+            return None
+        waited_from = time.perf_counter()
+        try:
+            result = spec.future.result(timeout=timeout)
+        except Exception:
+            # Timed out, cancelled or the call itself failed
+            spec.future.cancel()
+            with self._lock:
+                self.misses += 1
+            return None
+        # Saved time: how long the call took minus how long we still had to wait for it
+        waited = time.perf_counter() - waited_from
+        duration = (spec.finished or time.perf_counter()) - spec.started
+        with self._lock:
+            self.hits += 1
+            self.seconds_saved += max(duration - waited, 0.0)
+        return result
+
+    def stats(self):
+        with self._lock:
+            used = self.hits + self.misses
+            return {
+                "started": self.started,
+                "hits": self.hits,
+                "misses": self.misses,
+                "discarded": self.discarded,
+                "hit_rate": self.hits / used if used else 0.0,
+                "seconds_saved": self.seconds_saved,
+                "avg_seconds_saved": self.seconds_saved / self.hits if self.hits else 0.0,
+            }
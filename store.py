@@ -0,0 +1,249 @@
+"""
+Durable interview session store.
+
+Sessions are identified by an unguessable token that the app puts in the page URL, so an
+interview can be resumed after a server restart or a dropped connection. Messages are
+appended one row at a time (never rewritten as a blob), scalar state is a small JSON
+document, and large artifacts (test results, profiles, feedback reviews) are stored
+zlib-compressed and only loaded when needed. This lets the app page old history out of
+memory and keep per-session RAM small.
+
+open_store("") gives an in-memory store (nothing survives a restart); any other value is
+the path of an SQLite database.
+"""
+
+import json
+import secrets
+import sqlite3
+import threading
+import time
+import zlib
+
+
+def new_token():
+    return secrets.token_urlsafe(16)
+
+
+def _pack(value):
+    return zlib.compress(json.dumps(value).encode())
+
+
+def _unpack(blob):
+    return json.loads(zlib.decompress(blob).decode())
+
+
+class SessionStore:
+    """Interface shared by the store backends"""
+
+    def create(self):
+        """Create an empty session and return its token"""
+        raise NotImplementedError
+
+    def load_state(self, token):
+        """Scalar session state, or None if the session doesn't exist"""
+        raise NotImplementedError
+
+    def save_state(self, token, state):
+        raise NotImplementedError
+
+    def append_messages(self, token, start, messages):
+        """Store messages at positions start, start+1, ... (re-appending the same positions is harmless)"""
+        raise NotImplementedError
+
+    def load_messages(self, token, start=0, end=None):
+        raise NotImplementedError
+
+    def save_artifact(self, token, name, value):
+        raise NotImplementedError
+
+    def load_artifact(self, token, name, default=None):
+        raise NotImplementedError
+
+    def delete(self, token):
+        raise NotImplementedError
+
+    def prune(self, max_idle_seconds):
+        """Delete sessions not updated for max_idle_seconds; returns how many were removed"""
+        raise NotImplementedError
+
+
+class MemorySessionStore(SessionStore):
+    """Process-local store for development; same interface, nothing is persisted"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sessions = {}
+
+    def create(self):
+        token = new_token()
+        with self._lock:
+            self._sessions[token] = {"updated": time.time(), "state": {}, "messages": [], "artifacts": {}}
+        return token
+
+    def _get(self, token):
+        session = self._sessions.get(token)
+        if session is not None:
+            session["updated"] = time.time()
+        return session
+
+    def load_state(self, token):
+        with self._lock:
+            session = self._get(token)
+            return dict(session["state"]) if session else None
+
+    def save_state(self, token, state):
+        with self._lock:
+            session = self._get(token)
+            if session:
+                session["state"] = dict(state)
+
+    def append_messages(self, token, start, messages):
+        with self._lock:
+            session = self._get(token)
+            if session:
+                stored = session["messages"]
+                del stored[start:]
+                stored.extend(dict(m) for m in messages)
+
+    def load_messages(self, token, start=0, end=None):
+        with self._lock:
+            session = self._get(token)
+            return [dict(m) for m in session["messages"][start:end]] if session else []
+
+    def save_artifact(self, token, name, value):
+        with self._lock:
+            session = self._get(token)
+            if session:
+                session["artifacts"][name] = _pack(value)
+
+    def load_artifact(self, token, name, default=None):
+        with self._lock:
+            session = self._get(token)
+            blob = session["artifacts"].get(name) if session else None
+        return _unpack(blob) if blob is not None else default
+
+    def delete(self, token):
+        with self._lock:
+            self._sessions.pop(token, None)
+
+    def prune(self, max_idle_seconds):
+        cutoff = time.time() - max_idle_seconds
+        with self._lock:
+            stale = [token for token, session in self._sessions.items() if session["updated"] < cutoff]
+            for token in stale:
+                del self._sessions[token]
+        return len(stale)
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    token TEXT PRIMARY KEY,
+    created REAL NOT NULL,
+    updated REAL NOT NULL,
+    state TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS messages (
+    token TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    PRIMARY KEY (token, idx)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS artifacts (
+    token TEXT NOT NULL,
+    name TEXT NOT NULL,
+    value BLOB NOT NULL,
+    PRIMARY KEY (token, name)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS sessions_updated ON sessions (updated);
+"""
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    SQLite backend (WAL mode, one connection per thread). Every write is its own short
+    transaction, so concurrent Streamlit sessions only contend for the write lock briefly.
+    """
+
+    def __init__(self, path, busy_timeout=5.0):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.executescript(SCHEMA)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=OFF")
+            self._local.conn = conn
+        return conn
+
+    def _touch(self, conn, token):
+        conn.execute("UPDATE sessions SET updated = ? WHERE token = ?", (time.time(), token))
+
+    def create(self):
+        token = new_token()
+        now = time.time()
+        with self._conn() as conn:
+            conn.execute("INSERT INTO sessions VALUES (?, ?, ?, ?)", (token, now, now, "{}"))
+        return token
+
+    def load_state(self, token):
+        row = self._conn().execute("SELECT state FROM sessions WHERE token = ?", (token,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save_state(self, token, state):
+        with self._conn() as conn:
+            conn.execute(
+                "UPDATE sessions SET state = ?, updated = ? WHERE token = ?",
+                (json.dumps(state), time.time(), token),
+            )
+
+    def append_messages(self, token, start, messages):
+        with self._conn() as conn:
+            conn.execute("DELETE FROM messages WHERE token = ? AND idx >= ?", (token, start))
+            conn.executemany(
+                "INSERT INTO messages VALUES (?, ?, ?, ?)",
+                [(token, start + i, m["role"], m["content"]) for i, m in enumerate(messages)],
+            )
+            self._touch(conn, token)
+
+    def load_messages(self, token, start=0, end=None):
+        rows = self._conn().execute(
+            "SELECT role, content FROM messages WHERE token = ? AND idx >= ? AND idx < ? ORDER BY idx",
+            (token, start, end if end is not None else 2 ** 62),
+        ).fetchall()
+        return [{"role": role, "content": content} for role, content in rows]
+
+    def save_artifact(self, token, name, value):
+        with self._conn() as conn:
+            conn.execute("INSERT OR REPLACE INTO artifacts VALUES (?, ?, ?)", (token, name, _pack(value)))
+            self._touch(conn, token)
+
+    def load_artifact(self, token, name, default=None):
+        row = self._conn().execute(
+            "SELECT value FROM artifacts WHERE token = ? AND name = ?", (token, name)
+        ).fetchone()
+        return _unpack(row[0]) if row else default
+
+    def delete(self, token):
+        with self._conn() as conn:
+            for table in ("messages", "artifacts", "sessions"):
+                conn.execute(f"DELETE FROM {table} WHERE token = ?", (token,))
+
+    def prune(self, max_idle_seconds):
+        cutoff = time.time() - max_idle_seconds
+        with self._conn() as conn:
+            stale = [row[0] for row in conn.execute("SELECT token FROM sessions WHERE updated < ?", (cutoff,))]
+            for table in ("messages", "artifacts", "sessions"):
+                conn.executemany(f"DELETE FROM {table} WHERE token = ?", [(token,) for token in stale])
+        return len(stale)
+
+
+def open_store(path):
+    """SQLite store at path, or an in-memory store if path is empty"""
+    return SQLiteSessionStore(path) if path else MemorySessionStore()
@@ -0,0 +1,323 @@
+"""
+Lightweight latency tracing for interview turns.
+
+Code wraps the operations that make up a turn (model calls, speech synthesis, transcription,
+code evaluation, rendering) in tracer.span(name). Spans are grouped into turns (one script
+run, plus the fragment reruns that follow it) per session, aggregated into per-span counters
+and latency histograms, and exported as Prometheus text (e.g. for node_exporter's textfile
+collector) and as JSONL records. Only the max_sessions most recently active sessions are kept.
+
+A disabled tracer hands out one shared no-op context manager, so instrumented code costs
+a method call per span when tracing is off.
+"""
+
+import bisect
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class _NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+class Span:
+    def __init__(self, tracer, name, attrs):
+        self.tracer = tracer
+        self.name = name
+        self.attrs = attrs
+        self.parent = None
+        self.start = None
+        self.seconds = None
+        self.error = None
+
+    def set(self, **attrs):
+        """Attach attributes discovered while the span runs (e.g. cache hit, bytes)"""
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        stack = self.tracer._stack()
+        self.parent = stack[-1].name if stack else None
+        stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.seconds = time.perf_counter() - self.start
+        self.tracer._stack().pop()
+        # Streamlit's rerun/stop are control flow, not failures
+        if exc_type is not None and exc_type.__name__ not in ("RerunException", "StopException"):
+            self.error = exc_type.__name__
+        self.tracer._finish(self)
+        return False
+
+
+class Turn:
+    """
+    Spans recorded during one script run of one session and the fragment reruns after it.
+    seconds adds up, for each of those runs, the time from its start to the end of its last
+    span (not the idle time between them); nested spans (e.g. the model call inside feedback)
+    also count towards their parent's total.
+    """
+
+    def __init__(self, session, index):
+        self.session = session
+        self.index = index
+        self.started = time.time()
+        self.runs = []      # [start, end of last span] per run
+        self.resume()
+        self.spans = []
+
+    def resume(self):
+        now = time.perf_counter()
+        self.runs.append([now, now])
+
+    @property
+    def seconds(self):
+        return sum(end - start for start, end in self.runs)
+
+    def summary(self):
+        totals = defaultdict(float)
+        for span in self.spans:
+            totals[span.name] += span.seconds
+        return dict(totals)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)   # last slot: above the largest bucket
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+class SessionTurns:
+    def __init__(self):
+        self.count = 0
+        self.open = None    # Turn of the run in progress
+        self.last = None    # last finished Turn
+
+
+class Tracer:
+    """
+    Process-wide tracer.
+    - jsonl_path: append one JSON record per span and per finished turn
+    - prom_path: rewrite Prometheus text metrics here after every turn
+    - max_sessions: sessions whose turns are kept (least recently active ones are dropped)
+    Exports that fail (e.g. a full disk) are counted in export_errors instead of raising into
+    the traced turn.
+    """
+
+    def __init__(self, enabled=False, jsonl_path=None, prom_path=None, buckets=DEFAULT_BUCKETS, prefix="interview",
+                 max_sessions=1000):
+        self.enabled = enabled
+        self.jsonl_path = jsonl_path
+        self.prom_path = prom_path
+        self.buckets = tuple(buckets)
+        self.prefix = prefix
+        self.max_sessions = max_sessions
+        self._lock = threading.Lock()
+        self._export_lock = threading.Lock()    # one metrics file rewrite at a time
+        self.export_errors = 0
+        self._local = threading.local()
+        self._histograms = {}
+        self._errors = defaultdict(int)
+        self._sessions = OrderedDict()  # session -> SessionTurns, least recently active first
+        self._session_count = 0         # sessions seen since start, dropped ones included
+        self._turn_count = 0
+
+    def span(self, name, **attrs):
+        """Context manager timing one operation of the current turn"""
+        if not self.enabled:
+            return _NOOP
+        return Span(self, name, attrs)
+
+    def begin_turn(self, session):
+        """
+        Start a new turn of session on this thread. Script runs can end anywhere (st.rerun,
+        st.stop), so the session's previous turn is finished here rather than at its end.
+        """
+        if not self.enabled:
+            return
+        self.end_turn(session)
+        with self._lock:
+            turns = self._session(session)
+            turns.count += 1
+            self._turn_count += 1
+            turn = turns.open = Turn(session, turns.count)
+        self._local.turn = turn
+
+    def resume_turn(self, session):
+        """
+        Attribute this thread's spans to the session's current turn. Fragment reruns don't run
+        the top of the script, where begin_turn is called, so fragments call this instead.
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            turn = self._session(session).open
+            if turn is not None:
+                turn.resume()
+        if turn is None:
+            self.begin_turn(session)
+        else:
+            self._local.turn = turn
+
+    def end_turn(self, session):
+        with self._lock:
+            turns = self._sessions.get(session)
+            turn = turns.open if turns else None
+            if turn is None:
+                return
+            turns.open = None
+            if not turn.spans:
+                return
+            turns.last = turn
+        self._write({
+            "type": "turn", "session": turn.session, "turn": turn.index, "ts": turn.started,
+            "seconds": turn.seconds, "spans": turn.summary(),
+        })
+        if self.prom_path:
+            self._write_prometheus()
+
+    def current_turn(self):
+        return getattr(self._local, "turn", None)
+
+    def _session(self, session):
+        """SessionTurns of session, marked as the most recently active (call with the lock held)"""
+        turns = self._sessions.get(session)
+        if turns is None:
+            turns = self._sessions[session] = SessionTurns()
+            self._session_count += 1
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        else:
+            self._sessions.move_to_end(session)
+        return turns
+
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def last_turn(self, session):
+        with self._lock:
+            turns = self._sessions.get(session)
+            return turns.last if turns else None
+
+    def _finish(self, span):
+        with self._lock:
+            histogram = self._histograms.get(span.name)
+            if histogram is None:
+                histogram = self._histograms[span.name] = Histogram(self.buckets)
+            histogram.observe(span.seconds)
+            if span.error:
+                self._errors[span.name] += 1
+        turn = self.current_turn()
+        if turn is not None:
+            turn.spans.append(span)
+            turn.runs[-1][1] = span.start + span.seconds
+        self._write({
+            "type": "span", "session": turn.session if turn else None, "turn": turn.index if turn else None,
+            "name": span.name, "parent": span.parent, "seconds": span.seconds, "error": span.error,
+            "attrs": span.attrs, "ts": time.time(),
+        })
+
+    def _write(self, record):
+        if not self.jsonl_path:
+            return
+        line = json.dumps(record, default=str) + "\n"
+        with self._lock:
+            try:
+                with open(self.jsonl_path, "a") as f:
+                    f.write(line)
+            except OSError:
+                self.export_errors += 1
+
+    def stats(self):
+        """{span: {"count", "mean", "errors"}} for display"""
+        with self._lock:
+            return {
+                name: {
+                    "count": h.count,
+                    "mean": h.total / h.count if h.count else 0.0,
+                    "errors": self._errors.get(name, 0),
+                }
+                for name, h in sorted(self._histograms.items())
+            }
+
+    def prometheus_text(self):
+        """Counters and latency histograms in the Prometheus text exposition format"""
+        metric = f"{self.prefix}_span_seconds"
+        lines = [
+            f"# HELP {metric} Duration of traced operations.",
+            f"# TYPE {metric} histogram",
+        ]
+        with self._lock:
+            histograms = {name: (list(h.counts), h.total, h.count) for name, h in sorted(self._histograms.items())}
+            errors = dict(self._errors)
+            sessions = self._session_count
+            turns = self._turn_count
+        for name, (counts, total, count) in histograms.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{metric}_bucket{{span="{name}",le="{bound}"}} {cumulative}')
+            lines.append(f'{metric}_bucket{{span="{name}",le="+Inf"}} {count}')
+            lines.append(f'{metric}_sum{{span="{name}"}} {total:.6f}')
+            lines.append(f'{metric}_count{{span="{name}"}} {count}')
+        lines += [
+            f"# HELP {self.prefix}_span_errors_total Traced operations that raised.",
+            f"# TYPE {self.prefix}_span_errors_total counter",
+        ]
+        lines += [f'{self.prefix}_span_errors_total{{span="{name}"}} {n}' for name, n in sorted(errors.items())]
+        lines += [
+            f"# HELP {self.prefix}_turns_total Script runs traced.",
+            f"# TYPE {self.prefix}_turns_total counter",
+            f"{self.prefix}_turns_total {turns}",
+            f"# HELP {self.prefix}_sessions Sessions seen since start.",
+            f"# TYPE {self.prefix}_sessions gauge",
+            f"{self.prefix}_sessions {sessions}",
+        ]
+        return "\n".join(lines) + "\n"
+
+    def _write_prometheus(self):
+        """Rewrite the metrics file atomically, through a temp file of its own in the same directory"""
+        with self._export_lock:
+            tmp = None
+            try:
+                with tempfile.NamedTemporaryFile(
+                    "w", dir=os.path.dirname(os.path.abspath(self.prom_path)), prefix=".metrics-", delete=False
+                ) as f:
+                    tmp = f.name
+                    f.write(self.prometheus_text())
+                os.chmod(tmp, 0o644)    # readable by the metrics collector, like a plain open() would make it
+                os.replace(tmp, self.prom_path)
+            except OSError:
+                self.export_errors += 1
+                if tmp:
+                    try:
+                        os.remove(tmp)
+                    except OSError:
+                        pass
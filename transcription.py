@@ -0,0 +1,119 @@
+"""
+Concurrent transcription of long recordings.
+
+A two-minute answer uploaded as one file waits for the whole file to be transcribed. Cut at
+pauses (see audio.split_at_silence), its segments are transcribed side by side and the text
+is stitched back together in order, so the wait is roughly that of the longest segment.
+Partial transcripts are reported as segments complete.
+
+Latency can be compared against the local fake API, whose transcription time grows with
+the length of the upload:
+
+    python transcription.py --seconds 120 --transcription-ms 300 --transcription-ms-per-s 20
+"""
+
+import argparse
+import json
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+
+from audio import TARGET_RATE, encode_wav, preprocess_audio
+
+
+def stitch(texts):
+    """Segment texts joined in order; pending (None) or empty segments are skipped"""
+    return re.sub(r"\s+", " ", " ".join(t.strip() for t in texts if t)).strip()
+
+
+def transcribe_segments(transcribe, segments, executor, on_partial=None):
+    """
+    Transcribe segments concurrently and return the stitched text.
+    - transcribe(segment) -> text, called from executor threads
+    - on_partial(texts): called from this thread as each segment completes, with the texts in
+      segment order (None where still pending)
+    If any segment fails, its error is raised once the others have finished, since a
+    transcript with a hole in the middle would misrepresent the answer.
+    """
+    if len(segments) == 1:
+        texts = [transcribe(segments[0])]
+        if on_partial:
+            on_partial(texts)
+        return stitch(texts)
+
+    futures = {executor.submit(transcribe, segment): i for i, segment in enumerate(segments)}
+    texts = [None] * len(segments)
+    error = None
+    for future in as_completed(futures):
+        try:
+            texts[futures[future]] = future.result()
+        except Exception as e:
+            error = error or e
+            continue
+        if on_partial:
+            on_partial(list(texts))
+    if error is not None:
+        raise error
+    return stitch(texts)
+
+
+# ---- Benchmark ----
+def synthetic_answer(seconds, seed=0):
+    """WAV bytes of tone bursts (4-10 s) separated by short pauses, like a spoken answer"""
+    rng = np.random.default_rng(seed)
+    parts, total = [], 0.0
+    while total < seconds:
+        length = rng.uniform(4.0, 10.0)
+        t = np.arange(int(length * TARGET_RATE)) / TARGET_RATE
+        parts.append(0.3 * np.sin(2 * np.pi * rng.uniform(150, 300) * t) * (0.6 + 0.4 * np.sin(2 * np.pi * 3 * t)))
+        parts.append(np.zeros(int(rng.uniform(0.5, 0.9) * TARGET_RATE)))
+        total += length + len(parts[-1]) / TARGET_RATE
+    return encode_wav(np.concatenate(parts).astype(np.float32), TARGET_RATE)
+
+
+def benchmark(llm, data, workers, runs=3):
+    """Median seconds to transcribe data as one upload vs. as concurrent segments"""
+    processed = preprocess_audio(data, segment=True)
+    segments = processed["segments"]
+
+    def transcribe(segment):
+        return llm.transcribe(segment, model="whisper-large-v3", language="en")
+
+    whole, split = [], []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for _ in range(runs):
+            start = time.perf_counter()
+            transcribe((processed["filename"], processed["data"]))
+            whole.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            transcribe_segments(transcribe, segments, executor)
+            split.append(time.perf_counter() - start)
+    return {
+        "audio_seconds": processed["seconds_out"],
+        "segments": len(segments),
+        "segment_seconds": [round((len(b) - 44) / 2 / TARGET_RATE, 1) for _, b in segments],
+        "whole_s": sorted(whole)[len(whole) // 2],
+        "segmented_s": sorted(split)[len(split) // 2],
+    }
+
+
+if __name__ == "__main__":
+    import fake_groq
+    from llm import LLMClient
+
+    parser = argparse.ArgumentParser(description="Whole vs. segmented transcription latency against the fake API")
+    parser.add_argument("--seconds", type=float, default=120.0, help="length of the synthetic answer")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--runs", type=int, default=3)
+    fake_groq.add_arguments(parser)
+    parser.set_defaults(transcription_ms_per_s=20.0)
+    args = parser.parse_args()
+
+    server, url = fake_groq.serve(fake_groq.config_from_args(args))
+    try:
+        llm = LLMClient(api_key="fake", base_url=url)
+        print(json.dumps(benchmark(llm, synthetic_answer(args.seconds), args.workers, args.runs), indent=2))
+    finally:
+        server.shutdown()
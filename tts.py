@@ -0,0 +1,204 @@
+"""
+Text-to-speech synthesis with a content-addressed cache.
+
+Clips are keyed by a hash of (text, lang, voice settings). A size-bounded LRU keeps recent
+clips in memory and a disk tier keeps them across restarts, so repeated phrases (greetings,
+hints, the coding success message) play without another gTTS network call.
+Playback speed is applied in the browser, so it is not part of the key.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from gtts import gTTS
+
+DEFAULT_MEMORY_BYTES = 32 * 1024 * 1024
+DEFAULT_DISK_FILES = 2000
+MAX_CHUNK_CHARS = 200
+
+SENTENCE_BREAK = re.compile(r"(?<=[.!?])\s+|\n+")
+
+
+def synthesize(text, lang="en", slow=False):
+    """Call gTTS and return the MP3 bytes"""
+    fp = BytesIO()
+    gTTS(text=text, lang=lang, slow=slow).write_to_fp(fp)
+    return fp.getvalue()
+
+
+def normalize_text(text):
+    """Collapse whitespace so trivially different copies of a phrase share one entry"""
+    return " ".join(text.split())
+
+
+class TTSCache:
+    """
+    Two-tier cache of synthesized speech.
+    - Memory: LRU bounded by total bytes (max_bytes)
+    - Disk: one MP3 file per key in disk_dir, pruned by least recent use beyond max_disk_files
+    Safe to share between sessions; all access to the memory tier is locked.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MEMORY_BYTES, disk_dir=None, max_disk_files=DEFAULT_DISK_FILES):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.max_disk_files = max_disk_files
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(text, lang="en", slow=False):
+        payload = json.dumps([normalize_text(text), lang, slow], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, f"{key}.mp3")
+
+    def _remember(self, key, data):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return
+            self._entries[key] = data
+            self._size += len(data)
+            while self._size > self.max_bytes and len(self._entries) > 1:
+                _, old = self._entries.popitem(last=False)
+                self._size -= len(old)
+
+    def get(self, key, count=True):
+        """Return cached MP3 bytes for key, or None; count=False leaves the hit/miss stats alone"""
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                self.hits += count
+                return data
+
+        if self.disk_dir:
+            path = self._disk_path(key)
+            try:
+                with open(path, "rb") as f:
+                    data = f.read()
+                os.utime(path)
+            except OSError:
+                data = None
+            if data:
+                self._remember(key, data)
+                with self._lock:
+                    self.disk_hits += count
+                return data
+
+        with self._lock:
+            self.misses += count
+        return None
+
+    def put(self, key, data):
+        self._remember(key, data)
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            self._prune_disk()
+        except OSError:
+            pass
+
+    def _prune_disk(self):
+        files = [os.path.join(self.disk_dir, n) for n in os.listdir(self.disk_dir) if n.endswith(".mp3")]
+        if len(files) <= self.max_disk_files:
+            return
+        files.sort(key=os.path.getmtime)
+        for path in files[:len(files) - self.max_disk_files]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def get_or_synthesize(self, text, lang="en", slow=False):
+        """Return (key, MP3 bytes) for text, synthesizing and caching them on a miss"""
+        key = self.make_key(text, lang, slow)
+        data = self.get(key)
+        if data is None:
+            data = synthesize(normalize_text(text), lang=lang, slow=slow)
+            self.put(key, data)
+        return key, data
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._size,
+            }
+
+
+def split_sentences(text, max_chars=MAX_CHUNK_CHARS):
+    """
+    Split text into speakable chunks at sentence boundaries.
+    Short sentences are merged up to max_chars; longer ones are split at word boundaries.
+    The first chunk is kept to a single sentence so playback can start as early as possible.
+    """
+    chunks = []
+    current = ""
+    for sentence in SENTENCE_BREAK.split(text):
+        sentence = normalize_text(sentence)
+        if not sentence:
+            continue
+        while len(sentence) > max_chars:
+            cut = sentence.rfind(" ", 0, max_chars)
+            if cut <= 0:
+                cut = max_chars
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(sentence[:cut].strip())
+            sentence = sentence[cut:].strip()
+        if current and (not chunks or len(current) + 1 + len(sentence) > max_chars):
+            chunks.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}" if current else sentence
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def synthesize_chunks(cache, text, executor, lang="en", slow=False):
+    """
+    Synthesize text sentence by sentence on the executor and yield (key, MP3 clip) in order.
+    All chunks are submitted at once, so the first clip is yielded as soon as it is ready
+    while the rest are still being synthesized.
+    """
+    futures = [
+        executor.submit(cache.get_or_synthesize, chunk, lang, slow)
+        for chunk in split_sentences(text)
+    ]
+    try:
+        for future in futures:
+            yield future.result()
+    finally:
+        for future in futures:
+            future.cancel()
+
+
+def make_executor(max_workers=4):
+    return ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tts")